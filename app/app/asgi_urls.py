@@ -0,0 +1,21 @@
+"""URL configuration served under ASGI
+
+The recipe read endpoints are served by async views, every other URL by
+the views of app.urls.
+"""
+from django.urls import re_path
+
+from app.urls import urlpatterns as sync_urlpatterns
+
+from recipe import async_views
+
+urlpatterns = [
+    re_path(
+        r'^api/recipe/(?:recipes|tags|ingredients)/$',
+        async_views.list_view
+    ),
+    re_path(
+        r'^api/recipe/recipes/(?P<pk>[^/.]+)/$',
+        async_views.detail_view
+    ),
+] + sync_urlpatterns
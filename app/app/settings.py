@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -55,7 +56,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'app.urls'
+ROOT_URLCONF = os.environ.get('ROOT_URLCONF', 'app.urls')
 
 TEMPLATES = [
     {
@@ -86,10 +87,51 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
+        'OPTIONS': {
+            # Bound each connection attempt, as wait_for_db retries them
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
     }
 }
 
 
+# Cached list responses, data versions and token resolutions must be seen
+# by every worker, so deployments share a memcached; without one each
+# process caches on its own, which the core.W001 check reports unless
+# DEBUG is on
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION')
+if MEMCACHED_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION.split(','),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# New passwords are hashed with the first hasher, and logins rehash
+# passwords stored with the others to it
+PASSWORD_HASHERS = [
+    'core.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Password hashing runs in a pool of this many threads, accepting this
+# many more hashes queued before rejecting logins with 429
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 2))
+PASSWORD_HASHING_QUEUE_DEPTH = int(
+    os.environ.get('PASSWORD_HASHING_QUEUE_DEPTH', 16)
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -132,5 +174,11 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# 'django' streams media with FileResponse; 'x-accel-redirect' (nginx)
+# or 'x-sendfile' (Apache, lighttpd) hands files to the front proxy,
+# which serves MEDIA_ACCEL_PREFIX from MEDIA_ROOT as an internal location
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
 
 AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
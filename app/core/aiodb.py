@@ -0,0 +1,240 @@
+"""Non-blocking PostgreSQL reads for async views
+
+Django 3.1's ORM only runs queries synchronously. This module compiles
+ORM querysets with Django and runs the SQL on psycopg2 asynchronous
+connections driven by the event loop, so awaiting a query never ties up
+a thread.
+"""
+import asyncio
+import weakref
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+
+POOL_SIZE = getattr(settings, 'ASYNC_DB_POOL_SIZE', 10)
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def available(using='default'):
+    """Return whether the database supports asynchronous reads"""
+    return connections[using].vendor == 'postgresql'
+
+
+async def _wait(conn):
+    """Wait on the event loop until an asynchronous operation is done"""
+    loop = asyncio.get_running_loop()
+    fileno = conn.fileno()
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        ready = loop.create_future()
+        if state == psycopg2.extensions.POLL_READ:
+            loop.add_reader(fileno, ready.set_result, None)
+            try:
+                await ready
+            finally:
+                loop.remove_reader(fileno)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            loop.add_writer(fileno, ready.set_result, None)
+            try:
+                await ready
+            finally:
+                loop.remove_writer(fileno)
+        else:
+            raise psycopg2.OperationalError(f'Bad poll state {state}')
+
+
+class ConnectionPool:
+    """Pool of asynchronous connections used by one event loop"""
+
+    def __init__(self, using, size):
+        self.using = using
+        self.size = size
+        self.idle = []
+        self.in_use = 0
+        self.slots = asyncio.Semaphore(size)
+
+    async def _connect(self):
+        """Open a connection set up the way Django sets up its own"""
+        params = connections[self.using].get_connection_params()
+        conn = psycopg2.connect(async_=1, **params)
+        await _wait(conn)
+        # Django's JSONField decodes JSON itself
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=conn,
+            loads=lambda value: value
+        )
+        if settings.USE_TZ:
+            cursor = conn.cursor()
+            cursor.execute("SET TIME ZONE 'UTC'")
+            await _wait(conn)
+
+        return conn
+
+    def _pop_idle(self):
+        """Return an idle connection still open, or None"""
+        while self.idle:
+            conn = self.idle.pop()
+            if not conn.closed:
+                return conn
+
+        return None
+
+    async def _run(self, conn, sql, params):
+        """Run a query on a connection and return all of its rows"""
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        await _wait(conn)
+
+        return cursor.fetchall()
+
+    async def fetchall(self, sql, params):
+        """Run a query and return all of its rows
+
+        An idle connection found broken when used, such as one the server
+        closed, is replaced and the query run once more.
+        """
+        async with self.slots:
+            self.in_use += 1
+            try:
+                conn = self._pop_idle()
+                reused = conn is not None
+                if not reused:
+                    conn = await self._connect()
+                try:
+                    try:
+                        rows = await self._run(conn, sql, params)
+                    except psycopg2.Error:
+                        if not reused or not conn.closed:
+                            raise
+                        conn = await self._connect()
+                        rows = await self._run(conn, sql, params)
+                except BaseException:
+                    conn.close()
+                    raise
+                self.idle.append(conn)
+            finally:
+                self.in_use -= 1
+
+        return rows
+
+    def state(self):
+        """Return the size of the pool and how its connections are used"""
+        return {
+            'size': self.size,
+            'idle': len(self.idle),
+            'in_use': self.in_use,
+        }
+
+    def close(self):
+        """Close the idle connections"""
+        while self.idle:
+            self.idle.pop().close()
+
+
+def get_pool(using='default'):
+    """Return the connection pool of the running event loop"""
+    loop = asyncio.get_running_loop()
+    pools = _pools.setdefault(loop, {})
+    if using not in pools:
+        pools[using] = ConnectionPool(using, POOL_SIZE)
+
+    return pools[using]
+
+
+def close_pool(using='default'):
+    """Close the connections of the running event loop's pool"""
+    pools = _pools.get(asyncio.get_running_loop(), {})
+    if using in pools:
+        pools.pop(using).close()
+
+
+def pool_states(using='default'):
+    """Return the state of the pools of every event loop"""
+    return [
+        pools[using].state()
+        for pools in list(_pools.values()) if using in pools
+    ]
+
+
+async def fetch_values(queryset):
+    """Return the rows of a values() queryset as dicts
+
+    The SQL and the conversion of the results are Django's own, only
+    the query runs asynchronously.
+    """
+    query = queryset.query
+    compiler = query.get_compiler(queryset.db)
+    try:
+        sql, params = compiler.as_sql()
+    except EmptyResultSet:
+        return []
+
+    rows = await get_pool(queryset.db).fetchall(sql, params)
+    names = [
+        *query.extra_select,
+        *query.values_select,
+        *query.annotation_select,
+    ]
+
+    return [
+        dict(zip(names, row))
+        for row in compiler.results_iter(results=[rows])
+    ]
+
+
+async def fetch_instances(queryset):
+    """Return the model instances of a queryset
+
+    Instances are built the way the ORM builds them, including
+    annotations. Related objects are not followed, see fetch_related().
+    """
+    query = queryset.query
+    compiler = query.get_compiler(queryset.db)
+    try:
+        sql, params = compiler.as_sql()
+    except EmptyResultSet:
+        return []
+
+    rows = await get_pool(queryset.db).fetchall(sql, params)
+    select_fields = compiler.klass_info['select_fields']
+    start, end = select_fields[0], select_fields[-1] + 1
+    names = [
+        column.target.attname for column, *_ in compiler.select[start:end]
+    ]
+
+    instances = []
+    for row in compiler.results_iter(results=[rows]):
+        instance = queryset.model.from_db(queryset.db, names, row[start:end])
+        for name, position in compiler.annotation_col_map.items():
+            setattr(instance, name, row[position])
+        instances.append(instance)
+
+    return instances
+
+
+async def fetch_related(instance, lookups):
+    """Load the many-to-many relations of one instance
+
+    Each lookup is a Prefetch with the queryset of a relation of the
+    instance, and the results are stored where prefetch_related() would
+    store them, so reading the relation runs no query.
+    """
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+
+    for lookup in lookups:
+        manager = getattr(instance, lookup.prefetch_through)
+        related = lookup.queryset.filter(**manager.core_filters)
+        related._result_cache = await fetch_instances(related)
+        related._prefetch_done = True
+        instance._prefetched_objects_cache[manager.prefetch_cache_name] = \
+            related
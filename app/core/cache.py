@@ -0,0 +1,32 @@
+"""Versions kept in the shared cache to invalidate derived entries
+
+Entries derived from some data record the version they were built
+under and are only used while it is current. Advancing the version
+thus drops every such entry at once, in every process sharing the
+cache.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def current_version(key):
+    """Return the version stored under a cache key"""
+    version = cache.get(key)
+    if version is None:
+        # Start from a fresh value so an evicted version never comes back
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+
+    return version
+
+
+def advance_version(key):
+    """Store a new version under a cache key once the transaction commits
+
+    A read between the change and its commit would otherwise derive an
+    entry from the old data under the new version. The version is the
+    time of the change in nanoseconds.
+    """
+    transaction.on_commit(lambda: cache.set(key, time.time_ns(), None))
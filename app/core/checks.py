@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """Warn when workers cannot share the default cache"""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend not in LOCAL_CACHE_BACKENDS:
+        return []
+
+    return [Warning(
+        'The default cache is local to each process, so workers serve '
+        'stale data after writes handled by other workers.',
+        hint='Set MEMCACHED_LOCATION to the memcached servers shared by '
+             'all workers, e.g. "memcached:11211".',
+        id='core.W001',
+    )]
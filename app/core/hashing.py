@@ -0,0 +1,111 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from rest_framework import exceptions, status
+
+
+class HashingSaturated(exceptions.APIException):
+    """Raised when the password hashing queue is full"""
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = 'Too many logins in progress, try again shortly.'
+    default_code = 'hashing_saturated'
+    wait = 1
+
+
+class HashingTimeout(exceptions.APIException):
+    """Raised when a queued password hash is not done in time"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Password check timed out, try again shortly.'
+    default_code = 'hashing_timeout'
+    wait = 1
+
+
+class HashingPool:
+    """Thread pool running password hashes with a bounded queue
+
+    hashlib releases the GIL while hashing, so the workers run in
+    parallel with each other and with request threads. At most
+    ``workers + queue_depth`` hashes are accepted at once, and the rest
+    are rejected straight away rather than queueing behind them.
+    """
+
+    def __init__(self, workers, queue_depth, timeout):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='password-hashing'
+        )
+        self.slots = threading.BoundedSemaphore(workers + queue_depth)
+        self.timeout = timeout
+
+    def run(self, func, *args):
+        """Run func in the pool and return its result"""
+        if not self.slots.acquire(blocking=False):
+            raise HashingSaturated()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda done: self.slots.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise HashingTimeout()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the password hashing pool, starting it if needed"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(
+                getattr(
+                    settings,
+                    'PASSWORD_HASHING_WORKERS',
+                    min(4, os.cpu_count() or 1)
+                ),
+                getattr(settings, 'PASSWORD_HASHING_QUEUE_DEPTH', 16),
+                getattr(settings, 'PASSWORD_HASHING_TIMEOUT', 10)
+            )
+
+    return _pool
+
+
+def make_password(password):
+    """Hash a password with the preferred hasher in the pool"""
+    return get_pool().run(hashers.make_password, password)
+
+
+def _verify(password, encoded):
+    """Return whether the password matches and needs rehashing"""
+    updates = []
+    verified = hashers.check_password(password, encoded, updates.append)
+
+    return verified, bool(updates)
+
+
+def check_password(password, encoded, setter=None):
+    """Check a password in the pool
+
+    The setter is called on the calling thread, with the password, when
+    the password is correct but was hashed with other settings than the
+    first of PASSWORD_HASHERS, so it can be upgraded on login. The
+    upgrade hashes in the pool too, and is left for a later login when
+    the pool is busy rather than failing a verified password.
+    """
+    verified, must_update = get_pool().run(_verify, password, encoded)
+    if verified and must_update and setter:
+        try:
+            setter(password)
+        except (HashingSaturated, HashingTimeout):
+            pass
+
+    return verified
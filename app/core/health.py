@@ -0,0 +1,32 @@
+"""Database health checks for wait_for_db and the health endpoints"""
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import aiodb
+
+
+def probe_database(using=DEFAULT_DB_ALIAS):
+    """Run a trivial query and return its round trip time in seconds
+
+    The connection is opened first if needed, so a cold worker's first
+    probe includes connecting. Raises OperationalError when the database
+    cannot be reached.
+    """
+    started = time.perf_counter()
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+    return time.perf_counter() - started
+
+
+def pool_state(using=DEFAULT_DB_ALIAS):
+    """Return the state of the database connections of this process"""
+    connection = connections[using]
+    return {
+        'vendor': connection.vendor,
+        'connected': connection.connection is not None,
+        'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'async_pools': aiodb.pool_states(using),
+    }
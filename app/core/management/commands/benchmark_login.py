@@ -0,0 +1,91 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+
+BENCHMARK_EMAIL = 'benchmark-login@example.com'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    """Django command to measure login throughput of the token endpoint"""
+    help = (
+        'Log in concurrently through the token endpoint and report the '
+        'throughput, latencies and rejected requests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--url-name',
+            default='user:token',
+            help='URL name of the login endpoint'
+        )
+
+    def login(self, url):
+        """Log in once, returning the status code and latency"""
+        client = Client(HTTP_HOST='localhost')
+        started = time.perf_counter()
+        res = client.post(url, {
+            'email': BENCHMARK_EMAIL,
+            'password': BENCHMARK_PASSWORD,
+        })
+
+        return res.status_code, time.perf_counter() - started
+
+    def run_logins(self, url, count):
+        """Log in count times on this thread"""
+        try:
+            return [self.login(url) for _ in range(count)]
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            email=BENCHMARK_EMAIL
+        )
+        user.set_password(BENCHMARK_PASSWORD)
+        user.save()
+        url = reverse(options['url_name'])
+        concurrency = options['concurrency']
+        counts = [
+            options['requests'] // concurrency +
+            (index < options['requests'] % concurrency)
+            for index in range(concurrency)
+        ]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = [
+                result
+                for batch in executor.map(
+                    lambda count: self.run_logins(url, count),
+                    counts
+                )
+                for result in batch
+            ]
+        elapsed = time.perf_counter() - started
+
+        statuses = Counter(status for status, _ in results)
+        latencies = sorted(latency for _, latency in results)
+        self.stdout.write(
+            f'{len(results)} logins in {elapsed:.2f}s '
+            f'({len(results) / elapsed:.1f}/s) with {concurrency} threads'
+        )
+        self.stdout.write(
+            'Latency p50 {:.0f}ms p95 {:.0f}ms max {:.0f}ms'.format(
+                latencies[len(latencies) // 2] * 1000,
+                latencies[int(len(latencies) * 0.95)] * 1000,
+                latencies[-1] * 1000
+            )
+        )
+        self.stdout.write('Statuses ' + ', '.join(
+            f'{status}: {count}' for status, count in sorted(statuses.items())
+        ))
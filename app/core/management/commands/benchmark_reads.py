@@ -0,0 +1,197 @@
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core import aiodb, models
+
+
+BENCHMARK_EMAIL = 'benchmark-reads@example.com'
+
+
+class Command(BaseCommand):
+    """Django command to compare the WSGI and ASGI recipe read paths"""
+    help = (
+        'Read recipes concurrently through the WSGI application with a '
+        'pool of worker threads and through the ASGI application on one '
+        'event loop, and report the throughput and latencies of each.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Worker threads of the WSGI server'
+        )
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument(
+            '--url-name',
+            default='recipe:recipe-list',
+            help='URL name of the endpoint to read'
+        )
+
+    def setup_data(self, count):
+        """Return the token of a user owning count recipes"""
+        user, _ = get_user_model().objects.get_or_create(
+            email=BENCHMARK_EMAIL
+        )
+        missing = count - models.Recipe.objects.filter(user=user).count()
+        models.Recipe.objects.bulk_create(
+            models.Recipe(
+                user=user,
+                title=f'Benchmark recipe {index}',
+                time_minutes=10,
+                price=5
+            )
+            for index in range(max(missing, 0))
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+
+        return token.key
+
+    def wsgi_get(self, application, path, query, auth):
+        """Make one GET through the WSGI application"""
+        statuses = []
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost',
+            'HTTP_AUTHORIZATION': auth,
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+        }
+        started = time.perf_counter()
+        response = application(
+            environ,
+            lambda status, headers, exc_info=None: statuses.append(status)
+        )
+        b''.join(response)
+        response.close()
+
+        return int(statuses[0].split()[0]), time.perf_counter() - started
+
+    async def asgi_get(self, application, path, query, auth):
+        """Make one GET through the ASGI application"""
+        messages = []
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [
+                (b'host', b'localhost'),
+                (b'authorization', auth.encode()),
+            ],
+            'server': ('localhost', 80),
+            'client': ('127.0.0.1', 0),
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        started = time.perf_counter()
+        await application(scope, receive, send)
+
+        return messages[0]['status'], time.perf_counter() - started
+
+    def run_wsgi(self, path, queries, auth, threads):
+        """Serve the reads with a pool of WSGI worker threads"""
+        application = get_wsgi_application()
+        workers = set()
+
+        def read(query):
+            workers.add(threading.get_ident())
+            return self.wsgi_get(application, path, query, auth)
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(read, queries))
+            # Each worker thread holds its own database connection
+            list(executor.map(lambda _: connection.close(), range(threads)))
+
+        return results, len(workers)
+
+    async def run_asgi(self, path, queries, auth, concurrency):
+        """Serve the reads on one event loop with bounded concurrency"""
+        application = get_asgi_application()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def read(query):
+            async with slots:
+                return await self.asgi_get(application, path, query, auth)
+
+        try:
+            return await asyncio.gather(*(read(query) for query in queries))
+        finally:
+            aiodb.close_pool()
+
+    def report(self, name, results, elapsed, detail):
+        """Write the throughput and latencies of a run"""
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(status != 200 for status, _ in results)
+        self.stdout.write(
+            '{}: {:.1f} req/s, p50 {:.0f}ms p95 {:.0f}ms max {:.0f}ms, '
+            '{} errors, {}'.format(
+                name,
+                len(results) / elapsed,
+                latencies[len(latencies) // 2] * 1000,
+                latencies[int(len(latencies) * 0.95)] * 1000,
+                latencies[-1] * 1000,
+                errors,
+                detail
+            )
+        )
+
+    def handle(self, *args, **options):
+        auth = f'Token {self.setup_data(options["recipes"])}'
+        path = reverse(options['url_name'])
+        concurrency = options['concurrency']
+        threads = min(options['threads'], concurrency)
+        # A distinct query string per request bypasses the list cache
+        queries = [f'bench={index}' for index in range(options['requests'])]
+
+        started = time.perf_counter()
+        results, workers = self.run_wsgi(path, queries, auth, threads)
+        self.report(
+            'WSGI',
+            results,
+            time.perf_counter() - started,
+            f'{workers} threads serving {threads} requests at a time'
+        )
+
+        with override_settings(ROOT_URLCONF='app.asgi_urls'):
+            started = time.perf_counter()
+            results = asyncio.run(
+                self.run_asgi(path, queries, auth, concurrency)
+            )
+            self.report(
+                'ASGI',
+                results,
+                time.perf_counter() - started,
+                f'1 event loop serving {concurrency} requests at a time'
+            )
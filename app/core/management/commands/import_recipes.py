@@ -0,0 +1,248 @@
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import models
+
+from recipe import bulk
+from recipe.cache import bump_version
+from recipe.export import split_csv_names
+from recipe.search import SEARCH_CONFIG
+
+
+RELATIONS = {
+    'tags': models.Tag,
+    'ingredients': models.Ingredient,
+}
+
+STAGING_TABLE = 'import_recipe_staging'
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes for a user from CSV/NDJSON"""
+    help = (
+        'Import recipes exported as CSV or NDJSON for a user. Progress is '
+        'recorded in the transaction of every chunk so an interrupted '
+        'import resumes after the last chunk loaded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--email', required=True, help='Owner email')
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'ndjson'),
+            help='Input format, guessed from the file extension by default'
+        )
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument(
+            '--source',
+            help='Name progress is recorded under, defaults to the '
+                 'absolute input path'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore recorded progress and import from the start'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        path = options['path']
+        input_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        progress, _ = models.ImportProgress.objects.get_or_create(
+            user=self.user,
+            source=options['source'] or os.path.abspath(path)
+        )
+        if options['restart']:
+            progress.records = 0
+            progress.save(update_fields=['records', 'updated'])
+        done = progress.records
+        chunk_size = options['chunk_size']
+        self.known = {field: {} for field in RELATIONS}
+
+        with open(path, newline='', encoding='utf-8') as source:
+            records = islice(self._records(source, input_format), done, None)
+            started = time.monotonic()
+            imported = skipped = 0
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+
+                items = [item for item in map(self._parse, chunk) if item]
+                skipped += len(chunk) - len(items)
+                with transaction.atomic():
+                    self._resolve_names(items)
+                    self._load(items)
+                    done += len(chunk)
+                    progress.records = done
+                    progress.save(update_fields=['records', 'updated'])
+                bump_version(self.user.id)
+                imported += len(items)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Imported {imported} recipes '
+                    f'({imported / max(elapsed, 1e-9):.0f} recipes/s)'
+                )
+
+        if skipped:
+            self.stderr.write(f'Skipped {skipped} invalid records')
+        self.stdout.write(self.style.SUCCESS(
+            f'Import complete: {done} records processed'
+        ))
+
+    def _records(self, source, input_format):
+        """Yield raw records from the input without reading it whole"""
+        if input_format == 'csv':
+            for row in csv.DictReader(source):
+                for field in RELATIONS:
+                    names = row.get(field) or ''
+                    row[field] = split_csv_names(names) if names else []
+                yield row
+        else:
+            for line in source:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield None
+
+    def _parse(self, record):
+        """Return a clean recipe from a raw record, or None if invalid"""
+        try:
+            title = str(record['title']).strip()
+            item = {
+                'title': title,
+                'time_minutes': int(record['time_minutes']),
+                'price': Decimal(str(record['price'])).quantize(
+                    Decimal('0.01')
+                ),
+                'link': str(record.get('link') or ''),
+            }
+            for field in RELATIONS:
+                item[field] = list(dict.fromkeys(
+                    str(name).strip() for name in record.get(field) or ()
+                    if str(name).strip()
+                ))
+        except (TypeError, KeyError, ValueError, InvalidOperation):
+            return None
+
+        names = [name for field in RELATIONS for name in item[field]]
+        texts = [title, item['link']] + names
+        if not title or abs(item['price']) >= 1000 or \
+                not INT_MIN <= item['time_minutes'] <= INT_MAX or \
+                any(len(text) > 255 for text in texts):
+            return None
+
+        return item
+
+    def _resolve_names(self, items):
+        """Replace tag and ingredient names by IDs, creating missing ones"""
+        for field, model in RELATIONS.items():
+            known = self.known[field]
+            missing = list(dict.fromkeys(
+                name for item in items for name in item[field]
+                if name not in known
+            ))
+            if missing:
+                known.update(
+                    (obj['name'], obj['id'])
+                    for obj in bulk.get_or_create_by_names(
+                        model,
+                        self.user,
+                        missing
+                    )
+                )
+            for item in items:
+                item[f'{field}_names'] = ' '.join(item[field])
+                item[field] = [known[name] for name in item[field]]
+
+    def _load(self, items):
+        """Insert one chunk of recipes and their links
+
+        Runs inside the chunk's transaction, which also records progress.
+        """
+        if not items:
+            return
+        if connection.vendor != 'postgresql':
+            bulk.create_recipes(self.user, [
+                {key: value for key, value in item.items()
+                 if not key.endswith('_names')}
+                for item in items
+            ])
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE {STAGING_TABLE} ('
+                'recipe_id integer, title varchar(255), '
+                'time_minutes integer, price numeric(5, 2), '
+                'link varchar(255), tag_ids integer[], '
+                'ingredient_ids integer[], tag_names text, '
+                'ingredient_names text)'
+            )
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for item in items:
+                writer.writerow([
+                    item['title'],
+                    item['time_minutes'],
+                    item['price'],
+                    item['link'],
+                    '{%s}' % ','.join(map(str, item['tags'])),
+                    '{%s}' % ','.join(map(str, item['ingredients'])),
+                    item['tags_names'],
+                    item['ingredients_names'],
+                ])
+            buffer.seek(0)
+            cursor.copy_expert(
+                f'COPY {STAGING_TABLE} (title, time_minutes, price, link, '
+                'tag_ids, ingredient_ids, tag_names, ingredient_names) '
+                'FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL '
+                '(title, link, tag_names, ingredient_names))',
+                buffer
+            )
+            cursor.execute(
+                f'UPDATE {STAGING_TABLE} '
+                "SET recipe_id = nextval('core_recipe_id_seq')"
+            )
+            # Same weights as recipe.search.search_vector
+            cursor.execute(
+                'INSERT INTO core_recipe (id, user_id, title, time_minutes, '
+                'price, link, image_renditions, search_vector) '
+                'SELECT recipe_id, %(user_id)s, title, time_minutes, price, '
+                "link, '{}', "
+                "setweight(to_tsvector(%(config)s, title), 'A') || "
+                "setweight(to_tsvector(%(config)s, tag_names), 'B') || "
+                "setweight(to_tsvector(%(config)s, ingredient_names), 'C') "
+                f'FROM {STAGING_TABLE}',
+                {'user_id': self.user.id, 'config': SEARCH_CONFIG}
+            )
+            cursor.execute(
+                'INSERT INTO core_recipe_tags (recipe_id, tag_id) '
+                f'SELECT recipe_id, unnest(tag_ids) FROM {STAGING_TABLE}'
+            )
+            cursor.execute(
+                'INSERT INTO core_recipe_ingredients '
+                '(recipe_id, ingredient_id) '
+                'SELECT recipe_id, unnest(ingredient_ids) '
+                f'FROM {STAGING_TABLE}'
+            )
+            cursor.execute(f'DROP TABLE {STAGING_TABLE}')
@@ -1,22 +1,72 @@
+import random
 import time
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core import health
 
 
 class Command(BaseCommand):
-    """Django command to pause execution until database is available"""
+    """Django command to pause execution until database is available
+
+    The database is queried, so it is only reported available once it
+    accepts connections and answers. Retries back off exponentially with
+    full jitter up to a total timeout.
+    """
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds to wait in total before failing'
+        )
+        parser.add_argument(
+            '--initial-delay',
+            type=float,
+            default=0.1,
+            help='Longest wait after the first failed attempt'
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=5,
+            help='Longest wait between attempts'
+        )
+
+    def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        attempt = 0
+        while True:
+            attempt += 1
             try:
-                db_conn = connections['default']
-            except OperationalError:
+                latency = health.probe_database(options['database'])
+                break
+            except OperationalError as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    reason = str(exc).strip()
+                    raise CommandError(
+                        f'Database unavailable after {attempt} attempts: '
+                        f'{reason}'
+                    )
+
+                # Random waits keep restarting workers from retrying in step
+                delay = random.uniform(0, min(
+                    options['max_delay'],
+                    options['initial_delay'] * 2 ** (attempt - 1)
+                ))
+                delay = min(delay, remaining)
                 self.stdout.write(
-                    'Database unavailable. Waiting for 1 second...'
+                    f'Database unavailable. Waiting for {delay:.2f} '
+                    'seconds...'
                 )
-                time.sleep(1)
+                time.sleep(delay)
 
-        self.stdout.write(self.style.SUCCESS('Database available!'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available! Round trip {latency * 1000:.1f}ms '
+            f'after {attempt} attempt(s)'
+        ))
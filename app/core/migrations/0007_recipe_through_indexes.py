@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def add_index_concurrently(table, name, columns):
+    """Build an index without locking writes to the table"""
+    return migrations.RunSQL(
+        f'CREATE INDEX CONCURRENTLY {name} ON {table} ({columns});',
+        reverse_sql=f'DROP INDEX CONCURRENTLY {name};',
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        add_index_concurrently(
+            'core_recipe_tags',
+            'core_recipe_tags_tag_recipe_idx',
+            'tag_id, recipe_id'
+        ),
+        add_index_concurrently(
+            'core_recipe_ingredients',
+            'core_recipe_ingredients_ingredient_recipe_idx',
+            'ingredient_id, recipe_id'
+        ),
+    ]
@@ -0,0 +1,108 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge tags and ingredients sharing a user and name into one row"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        column = f'{model_name.lower()}_id'
+        groups = model.objects.values('user_id', 'name').annotate(
+            count=Count('id'),
+            keep=Min('id'),
+        ).filter(count__gt=1)
+
+        for group in groups:
+            duplicates = model.objects.filter(
+                user_id=group['user_id'],
+                name=group['name'],
+            ).exclude(id=group['keep'])
+            for duplicate_id in duplicates.values_list('id', flat=True):
+                linked = through.objects.filter(
+                    **{column: group['keep']}
+                ).values('recipe_id')
+                links = through.objects.filter(**{column: duplicate_id})
+                links.filter(recipe_id__in=linked).delete()
+                links.update(**{column: group['keep']})
+            duplicates.delete()
+
+
+def add_unique_concurrently(table, name):
+    """Build a unique index without locking writes, then adopt it
+
+    A duplicate inserted between merge_duplicates and the build fails
+    the build and leaves an INVALID index behind. Running the migration
+    again merges the new duplicates, drops that index and builds it
+    anew. Steps already done by an earlier run are skipped.
+    """
+    return migrations.RunSQL(
+        [
+            'DO $$ BEGIN '
+            'IF EXISTS (SELECT FROM pg_index JOIN pg_class '
+            'ON pg_class.oid = pg_index.indexrelid '
+            f"WHERE relname = '{name}' AND NOT indisvalid) THEN "
+            f'DROP INDEX {name}; '
+            'END IF; END $$;',
+            f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} (user_id, name);',
+            'DO $$ BEGIN '
+            'IF NOT EXISTS (SELECT FROM pg_constraint '
+            f"WHERE conname = '{name}') "
+            f'THEN ALTER TABLE {table} ADD CONSTRAINT {name} '
+            f'UNIQUE USING INDEX {name}; '
+            'END IF; END $$;',
+        ],
+        reverse_sql=f'ALTER TABLE {table} DROP CONSTRAINT {name};',
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_recipe_through_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicates,
+            migrations.RunPython.noop,
+            atomic=True,
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                add_unique_concurrently('core_tag', 'core_tag_user_name_uniq'),
+                add_unique_concurrently(
+                    'core_ingredient',
+                    'core_ingredient_user_name_uniq'
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='tag',
+                    constraint=models.UniqueConstraint(
+                        fields=('user', 'name'),
+                        name='core_tag_user_name_uniq'
+                    ),
+                ),
+                migrations.AddConstraint(
+                    model_name='ingredient',
+                    constraint=models.UniqueConstraint(
+                        fields=('user', 'name'),
+                        name='core_ingredient_user_name_uniq'
+                    ),
+                ),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,85 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+BACKFILL_CHUNK_SIZE = 10000
+SEARCH_CONFIG = 'english'
+
+
+def linked_names(Recipe, field, name_path):
+    """Return the space separated names linked to a recipe via field"""
+    links = getattr(Recipe, field).through.objects.filter(
+        recipe_id=OuterRef('pk')
+    ).order_by().values('recipe_id').annotate(
+        names=StringAgg(name_path, ' ')
+    ).values('names')
+
+    return Coalesce(Subquery(links), Value(''))
+
+
+def search_vector(Recipe):
+    """Return the search vector expression as it stood in this migration"""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(
+            linked_names(Recipe, 'tags', 'tag__name'),
+            weight='B',
+            config=SEARCH_CONFIG
+        ) +
+        SearchVector(
+            linked_names(Recipe, 'ingredients', 'ingredient__name'),
+            weight='C',
+            config=SEARCH_CONFIG
+        )
+    )
+
+
+def backfill_search_vectors(apps, schema_editor):
+    """Compute search vectors for existing recipes in chunks"""
+    Recipe = apps.get_model('core', 'Recipe')
+    ids = Recipe.objects.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        chunk = list(ids.filter(id__gt=last_id)[:BACKFILL_CHUNK_SIZE])
+        if not chunk:
+            break
+        with transaction.atomic():
+            Recipe.objects.filter(
+                id__gte=chunk[0],
+                id__lte=chunk[-1]
+            ).update(search_vector=search_vector(Recipe))
+        last_id = chunk[-1]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_user_scoped_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            backfill_search_vectors,
+            migrations.RunPython.noop,
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ),
+    ]
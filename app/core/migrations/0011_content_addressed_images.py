@@ -0,0 +1,43 @@
+# Generated by Django 3.1.14 on 2026-10-17 05:01
+
+import core.models
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_image_refs(apps, schema_editor):
+    """Record a reference count for every image already stored"""
+    Recipe = apps.get_model('core', 'Recipe')
+    ImageBlob = apps.get_model('core', 'ImageBlob')
+    counts = Recipe.objects.exclude(image='').exclude(
+        image__isnull=True
+    ).values('image').annotate(refs=Count('id')).order_by()
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=row['image'], refs=row['refs']) for row in counts],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refs', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.RunPython(count_image_refs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.1.14 on 2026-10-17 05:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_refreshtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('records', models.PositiveBigIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='importprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'source'), name='core_importprogress_user_source_uniq'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.1.14 on 2026-10-17 05:48
+
+import core.models
+import core.storage
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_importprogress'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=core.models.RecipeImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+    ]
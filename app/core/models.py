@@ -1,20 +1,46 @@
-import uuid
 import os
+import uuid
 from django.db import models
+from django.db.models.fields.files import ImageFieldFile
 from django.contrib.auth.models import AbstractBaseUser, \
                                         BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+
+from core import hashing
+from core.storage import image_storage
 
 
 def recipe_image_file_path(instance, filename):
-    """Generate file path for new recipe image"""
-    ext = filename.split('.')[-1]
-    filename = f'{uuid.uuid4()}.{ext}'
+    """Generate file path for new recipe image
+
+    The storage replaces the file name with the hash of its content.
+    """
+    ext = filename.split('.')[-1].lower()
+    filename = f'image.{ext}'
 
     return os.path.join('uploads/recipe/', filename)
 
 
+class RecipeImageFieldFile(ImageFieldFile):
+    """Recipe image noting on its recipe that a save took a reference"""
+
+    def save(self, name, content, save=True):
+        self.instance._image_stored = True
+        try:
+            super().save(name, content, save)
+        except BaseException:
+            self.instance.__dict__.pop('_image_stored', None)
+            raise
+
+
+class RecipeImageField(models.ImageField):
+    """Image field of recipes, whose storage counts references"""
+    attr_class = RecipeImageFieldFile
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_fields):
@@ -46,6 +72,24 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    def set_password(self, raw_password):
+        """Hash and set the password in the password hashing pool"""
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Check the password in the password hashing pool
+
+        A correct password hashed with outdated settings is rehashed
+        with the first of PASSWORD_HASHERS and saved.
+        """
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return hashing.check_password(raw_password, self.password, setter)
+
 
 class Tag(models.Model):
     """Tag to be used for a recipe"""
@@ -56,6 +100,14 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_uniq'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -69,6 +121,14 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_uniq'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -86,7 +146,73 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = RecipeImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=image_storage
+    )
+    image_renditions = models.JSONField(default=dict, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ImageBlob(models.Model):
+    """Reference count of a content addressed image file"""
+    name = models.CharField(max_length=255, unique=True)
+    refs = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class RefreshToken(models.Model):
+    """Revocable record backing a refresh token"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='refresh_tokens',
+        on_delete=models.CASCADE
+    )
+    jti = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField()
+    revoked = models.BooleanField(default=False)
+
+    def __str__(self):
+        return str(self.jti)
+
+
+class ImportProgress(models.Model):
+    """Number of input records of a recipe import already loaded"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='import_progress',
+        on_delete=models.CASCADE
+    )
+    source = models.CharField(max_length=255)
+    records = models.PositiveBigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'source'),
+                name='core_importprogress_user_source_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return self.source
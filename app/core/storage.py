@@ -0,0 +1,122 @@
+import hashlib
+import os
+import re
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+CONTENT_NAME_RE = re.compile(
+    r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}(?:_\w+)?\.\w+$'
+)
+
+
+def content_hash(content):
+    """Return the SHA-256 hex digest of a file's content
+
+    Uses the digest computed while the file was uploaded if there is
+    one, otherwise reads the file in chunks.
+    """
+    digest = getattr(content, 'content_hash', None)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def content_name(name, digest):
+    """Return the content addressed name of a file in name's directory"""
+    ext = os.path.splitext(name)[1].lower()
+
+    return os.path.join(
+        os.path.dirname(name),
+        digest[:2],
+        digest[2:4],
+        f'{digest}{ext}'
+    )
+
+
+def is_content_addressed(name):
+    """Return whether a stored name, or a rendition of it, is a hash
+
+    The content behind such a name never changes.
+    """
+    return CONTENT_NAME_RE.search(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files by the hash of their content
+
+    Identical content is written once. Every save takes a reference on
+    the stored file, and release() deletes it with the last reference.
+    """
+
+    def save(self, name, content, max_length=None):
+        """Store the content unless it is already stored, taking a ref"""
+        ImageBlob = apps.get_model('core', 'ImageBlob')
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(name, content_hash(content))
+        with transaction.atomic():
+            blob, _ = ImageBlob.objects.select_for_update().get_or_create(
+                name=name
+            )
+            if not self.exists(name):
+                super().save(name, content, max_length)
+            blob.refs += 1
+            blob.save(update_fields=['refs'])
+
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        """Keep the content address, a stored name already has the bytes"""
+        return name
+
+    def release(self, name, related=()):
+        """Drop a reference to a stored file
+
+        The file and the related names, such as renditions derived from
+        it, are deleted once the transaction dropping the last reference
+        commits, so a rollback never leaves a reference without its file.
+        """
+        ImageBlob = apps.get_model('core', 'ImageBlob')
+        with transaction.atomic():
+            blob = ImageBlob.objects.select_for_update().filter(
+                name=name
+            ).first()
+            if blob is None:
+                return
+            if blob.refs > 1:
+                blob.refs -= 1
+                blob.save(update_fields=['refs'])
+                return
+
+            blob.delete()
+            transaction.on_commit(
+                lambda: self._delete_unreferenced(name, related)
+            )
+
+    def _delete_unreferenced(self, name, related):
+        """Delete released files unless the name was stored again since"""
+        ImageBlob = apps.get_model('core', 'ImageBlob')
+        with transaction.atomic():
+            # Holding a row for the name blocks saves of it meanwhile
+            blobs = ImageBlob.objects.select_for_update()
+            blob, created = blobs.get_or_create(name=name)
+            if not created:
+                return
+
+            for stored in (name, *related):
+                self.delete(stored)
+            blob.delete()
+
+
+image_storage = ContentAddressedStorage()
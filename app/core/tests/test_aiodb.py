@@ -0,0 +1,52 @@
+import psycopg2
+
+from asgiref.sync import async_to_sync
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from core import aiodb
+
+
+class ConnectionPoolTests(TransactionTestCase):
+    """Test the pool of asynchronous database connections"""
+
+    def run_queries(self, between):
+        """Run a query on the pool twice, calling between() in between"""
+        async def queries():
+            pool = aiodb.get_pool()
+            try:
+                first = await pool.fetchall('SELECT 1', ())
+                between(pool.idle[0])
+                second = await pool.fetchall('SELECT 2', ())
+                return first, second, pool.state()
+            finally:
+                aiodb.close_pool()
+
+        return async_to_sync(queries)()
+
+    def test_connection_closed_by_server_replaced(self):
+        """Test a query on a connection the server closed is retried"""
+        def terminate(conn):
+            admin = psycopg2.connect(**connection.get_connection_params())
+            try:
+                with admin.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT pg_terminate_backend(%s)',
+                        [conn.get_backend_pid()]
+                    )
+            finally:
+                admin.close()
+
+        first, second, state = self.run_queries(terminate)
+
+        self.assertEqual(first, [(1,)])
+        self.assertEqual(second, [(2,)])
+        self.assertEqual(state['idle'], 1)
+
+    def test_closed_idle_connection_skipped(self):
+        """Test closed idle connections are not used again"""
+        first, second, state = self.run_queries(lambda conn: conn.close())
+
+        self.assertEqual(second, [(2,)])
+        self.assertEqual(state['idle'], 1)
@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import shared_cache_check
+
+
+LOCMEM = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+MEMCACHED = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': ['memcached:11211'],
+    }
+}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """Test the check that the default cache is shared by workers"""
+
+    @override_settings(DEBUG=False, CACHES=LOCMEM)
+    def test_local_cache_warns(self):
+        """Test a per-process cache is reported outside DEBUG"""
+        errors = shared_cache_check(None)
+
+        self.assertEqual([error.id for error in errors], ['core.W001'])
+
+    @override_settings(DEBUG=True, CACHES=LOCMEM)
+    def test_local_cache_in_debug(self):
+        """Test a per-process cache is accepted in DEBUG"""
+        self.assertEqual(shared_cache_check(None), [])
+
+    @override_settings(DEBUG=False, CACHES=MEMCACHED)
+    def test_shared_cache(self):
+        """Test a shared cache passes"""
+        self.assertEqual(shared_cache_check(None), [])
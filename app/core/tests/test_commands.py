@@ -1,24 +1,264 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core import models
+
+from recipe import export
+
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
+        out = StringIO()
+        call_command('wait_for_db', stdout=out)
 
-            self.assertEqual(gi.call_count, 1)
+        self.assertIn('Database available!', out.getvalue())
+        self.assertIn('after 1 attempt(s)', out.getvalue())
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
+        with patch('core.health.probe_database') as probe:
+            probe.side_effect = [OperationalError] * 5 + [0.002]
+            call_command('wait_for_db', stdout=StringIO())
+
+            self.assertEqual(probe.call_count, 6)
+
+        self.assertEqual(ts.call_count, 5)
+        for attempt, sleep_call in enumerate(ts.call_args_list):
+            self.assertLessEqual(sleep_call.args[0], 0.1 * 2 ** attempt)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_max_delay(self, ts):
+        """Test retries never wait longer than the maximum delay"""
+        with patch('core.health.probe_database') as probe:
+            probe.side_effect = [OperationalError] * 20 + [0.002]
+            call_command('wait_for_db', max_delay=0.5, stdout=StringIO())
+
+        self.assertLessEqual(max(c.args[0] for c in ts.call_args_list), 0.5)
+
+    def test_wait_for_db_timeout(self):
+        """Test waiting for db fails once the timeout has passed"""
+        with patch('core.health.probe_database') as probe:
+            probe.side_effect = OperationalError('connection refused')
+            with self.assertRaisesMessage(CommandError, 'connection refused'):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+            self.assertEqual(probe.call_count, 1)
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@user.com',
+            password='testpassword'
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write(self, name, content):
+        """Write an input file and return its path"""
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def _import(self, path, **options):
+        """Run the import command quietly"""
+        call_command(
+            'import_recipes',
+            path,
+            email=self.user.email,
+            stdout=StringIO(),
+            stderr=StringIO(),
+            **options
+        )
+
+    def _ndjson(self, count, start=0):
+        """Return count NDJSON recipes sharing tags and ingredients"""
+        return ''.join(json.dumps({
+            'title': f'Recipe, {i}',
+            'time_minutes': i,
+            'price': '4.50',
+            'link': '',
+            'tags': ['Vegan', f'Tag {i % 2}'],
+            'ingredients': ['Salt'],
+        }) + '\n' for i in range(start, start + count))
+
+    def test_import_ndjson(self):
+        """Test importing recipes dedupes tags and ingredients"""
+        models.Tag.objects.create(user=self.user, name='Vegan')
+        path = self._write('recipes.ndjson', self._ndjson(5))
+
+        self._import(path, chunk_size=2)
+
+        recipes = models.Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(
+            set(models.Tag.objects.values_list('name', flat=True)),
+            {'Vegan', 'Tag 0', 'Tag 1'}
+        )
+        recipe = recipes.get(title='Recipe, 3')
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'Vegan', 'Tag 1'}
+        )
+        self.assertEqual(recipe.ingredients.get().name, 'Salt')
+        self.assertEqual(recipe.link, '')
+        self.assertTrue(
+            models.Recipe.objects.filter(search_vector='vegan').exists()
+        )
+
+    def test_import_csv_skips_invalid(self):
+        """Test importing CSV skips invalid records"""
+        path = self._write('recipes.csv', (
+            'id,title,time_minutes,price,link,tags,ingredients\n'
+            '1,Toast,5,1.00,,Breakfast|Quick,Bread\n'
+            '2,Broken,soon,1.00,,,\n'
+            '3,Tea,3,0.50,https://tea.com,,\n'
+        ))
+
+        self._import(path)
+
+        self.assertEqual(
+            set(models.Recipe.objects.values_list('title', flat=True)),
+            {'Toast', 'Tea'}
+        )
+        toast = models.Recipe.objects.get(title='Toast')
+        self.assertEqual(toast.tags.count(), 2)
+
+    def test_import_skips_out_of_range_minutes(self):
+        """Test records whose minutes overflow an integer are skipped"""
+        records = [json.loads(line) for line in self._ndjson(3).splitlines()]
+        records[1]['time_minutes'] = 2 ** 31
+        path = self._write('recipes.ndjson', ''.join(
+            json.dumps(record) + '\n' for record in records
+        ))
+
+        self._import(path)
+
+        self.assertEqual(
+            sorted(models.Recipe.objects.values_list('title', flat=True)),
+            ['Recipe, 0', 'Recipe, 2']
+        )
+
+    @patch('core.management.commands.import_recipes.Command._load')
+    def test_import_failed_chunk_creates_no_names(self, mock_load):
+        """Test a failed chunk rolls back the names it created"""
+        mock_load.side_effect = OperationalError('connection lost')
+        path = self._write('recipes.ndjson', self._ndjson(2))
+
+        with self.assertRaises(OperationalError):
+            self._import(path)
+
+        self.assertFalse(models.Tag.objects.exists())
+        self.assertFalse(models.Ingredient.objects.exists())
+
+    def test_csv_export_round_trip(self):
+        """Test names holding the separator survive an export and import"""
+        names = ['sweet|sour', 'back\\slash', 'Vegan']
+        recipe = models.Recipe.objects.create(
+            user=self.user,
+            title='Pork',
+            time_minutes=20,
+            price=8
+        )
+        recipe.tags.add(*(
+            models.Tag.objects.create(user=self.user, name=name)
+            for name in names
+        ))
+        path = self._write(
+            'recipes.csv',
+            ''.join(export.csv_lines(export.export_rows(self.user)))
+        )
+        recipe.delete()
+        models.Tag.objects.all().delete()
+
+        self._import(path)
+
+        recipe = models.Recipe.objects.get(title='Pork')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            sorted(names)
+        )
+
+    def test_import_resumes(self):
+        """Test an import resumes after the last completed chunk"""
+        path = self._write('recipes.ndjson', self._ndjson(4))
+        models.ImportProgress.objects.create(
+            user=self.user,
+            source=path,
+            records=3
+        )
+
+        self._import(path, chunk_size=2)
+
+        self.assertEqual(
+            list(models.Recipe.objects.values_list('title', flat=True)),
+            ['Recipe, 3']
+        )
+        progress = models.ImportProgress.objects.get(user=self.user)
+        self.assertEqual(progress.records, 4)
+
+    def test_import_failed_chunk_not_recorded(self):
+        """Test a failed chunk is rolled back with its progress"""
+        path = self._write('recipes.ndjson', self._ndjson(4))
+        progress_save = models.ImportProgress.save
+
+        def fail_second_chunk(progress, *args, **kwargs):
+            progress_save(progress, *args, **kwargs)
+            if progress.records == 4:
+                raise OperationalError('connection lost')
+
+        with patch.object(
+            models.ImportProgress,
+            'save',
+            fail_second_chunk
+        ), self.assertRaises(OperationalError):
+            self._import(path, chunk_size=2)
+
+        self.assertEqual(models.Recipe.objects.count(), 2)
+        progress = models.ImportProgress.objects.get(user=self.user)
+        self.assertEqual(progress.records, 2)
+
+        self._import(path, chunk_size=2)
+
+        self.assertEqual(models.Recipe.objects.count(), 4)
+        self.assertEqual(
+            models.ImportProgress.objects.get(user=self.user).records,
+            4
+        )
+
+    def test_import_restart(self):
+        """Test restarting an import ignores recorded progress"""
+        path = self._write('recipes.ndjson', self._ndjson(2))
+        models.ImportProgress.objects.create(
+            user=self.user,
+            source=path,
+            records=2
+        )
+
+        self._import(path, restart=True)
+
+        self.assertEqual(models.Recipe.objects.count(), 2)
+
+    @patch('core.management.commands.import_recipes.connection')
+    def test_import_bulk_create_fallback(self, mock_connection):
+        """Test importing without COPY uses chunked bulk_create"""
+        mock_connection.vendor = 'sqlite'
+        path = self._write('recipes.ndjson', self._ndjson(3))
+
+        self._import(path, chunk_size=2)
 
-            self.assertEqual(gi.call_count, 6)
+        self.assertEqual(models.Recipe.objects.count(), 3)
+        recipe = models.Recipe.objects.get(title='Recipe, 0')
+        self.assertEqual(recipe.tags.count(), 2)
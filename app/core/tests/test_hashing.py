@@ -0,0 +1,154 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashing
+from core.hashers import ScryptPasswordHasher
+
+
+TOKEN_URL = reverse('user:token')
+
+
+class HashingPoolTests(TestCase):
+    """Test the bounded password hashing pool"""
+
+    def setUp(self):
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def block(self, pool):
+        """Occupy a pool slot until the test ends"""
+        started = threading.Event()
+
+        def wait():
+            started.set()
+            self.release.wait(10)
+
+        def occupy():
+            try:
+                pool.run(wait)
+            except hashing.HashingTimeout:
+                pass
+
+        thread = threading.Thread(target=occupy)
+        thread.start()
+        started.wait(10)
+
+        return thread
+
+    def test_run_returns_result(self):
+        """Test the pool returns the result of the function"""
+        pool = hashing.HashingPool(1, 0, 10)
+
+        self.assertEqual(pool.run(sum, [1, 2]), 3)
+
+    def test_saturated_pool_rejects(self):
+        """Test work beyond the workers and queue is rejected at once"""
+        pool = hashing.HashingPool(1, 0, 10)
+        self.block(pool)
+
+        with self.assertRaises(hashing.HashingSaturated):
+            pool.run(sum, [1, 2])
+
+    def test_slot_released_after_work(self):
+        """Test finished work frees its slot"""
+        pool = hashing.HashingPool(1, 0, 10)
+        thread = self.block(pool)
+        self.release.set()
+        thread.join(10)
+
+        self.assertEqual(pool.run(sum, [1, 2]), 3)
+
+    def test_queued_work_times_out(self):
+        """Test waiting longer than the timeout is rejected"""
+        pool = hashing.HashingPool(1, 1, 0.05)
+        self.block(pool)
+
+        with self.assertRaises(hashing.HashingTimeout):
+            pool.run(sum, [1, 2])
+
+    def test_login_rejected_when_saturated(self):
+        """Test the token endpoint answers 429 when the pool is full"""
+        get_user_model().objects.create_user('test@user.com', 'testpass')
+        pool = hashing.HashingPool(1, 0, 10)
+        self.block(pool)
+
+        with patch('core.hashing._pool', pool):
+            res = APIClient().post(TOKEN_URL, {
+                'email': 'test@user.com',
+                'password': 'testpass',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '1')
+
+
+class PasswordHasherTests(TestCase):
+    """Test password hashers and rehashing on login"""
+
+    def test_scrypt_hasher(self):
+        """Test scrypt hashes verify and detect outdated settings"""
+        hasher = ScryptPasswordHasher()
+        encoded = hasher.encode('testpass', hasher.salt())
+
+        self.assertTrue(encoded.startswith('scrypt$16384$'))
+        self.assertTrue(hasher.verify('testpass', encoded))
+        self.assertFalse(hasher.verify('wrongpass', encoded))
+        self.assertFalse(hasher.must_update(encoded))
+        self.assertTrue(
+            hasher.must_update(hasher.encode('testpass', 'salt', n=2 ** 10))
+        )
+
+    def test_new_password_uses_preferred_hasher(self):
+        """Test new passwords are hashed with the first hasher"""
+        user = get_user_model().objects.create_user(
+            'test@user.com',
+            'testpass'
+        )
+
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password('testpass'))
+
+    def test_login_rehashes_password(self):
+        """Test logging in upgrades passwords to the preferred hasher"""
+        user = get_user_model().objects.create_user('test@user.com')
+        user.password = make_password('testpass', hasher='pbkdf2_sha256')
+        user.save()
+
+        res = APIClient().post(TOKEN_URL, {
+            'email': 'test@user.com',
+            'password': 'testpass',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(check_password('testpass', user.password))
+
+    def test_login_skips_rehash_when_saturated(self):
+        """Test a busy pool skips the upgrade instead of the login"""
+        user = get_user_model().objects.create_user('test@user.com')
+        user.password = make_password('testpass', hasher='pbkdf2_sha256')
+        user.save()
+
+        with patch(
+            'core.hashing.make_password',
+            side_effect=hashing.HashingSaturated
+        ):
+            res = APIClient().post(TOKEN_URL, {
+                'email': 'test@user.com',
+                'password': 'testpass',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import health
+
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthTests(TestCase):
+    """Test the database probe and the health endpoints"""
+
+    def test_probe_database(self):
+        """Test probing the database returns the round trip time"""
+        latency = health.probe_database()
+
+        self.assertGreater(latency, 0)
+        self.assertTrue(health.pool_state()['connected'])
+
+    def test_healthz(self):
+        """Test the liveness endpoint reports the pool state"""
+        with patch('core.health.probe_database') as probe:
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['status'], 'ok')
+        self.assertEqual(res.json()['database']['vendor'], 'postgresql')
+        self.assertIn('no-cache', res['Cache-Control'])
+        probe.assert_not_called()
+
+    def test_readyz(self):
+        """Test the readiness endpoint reports the database latency"""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['status'], 'ok')
+        self.assertGreater(res.json()['latency_ms'], 0)
+        self.assertIn('async_pools', res.json()['database'])
+
+    def test_readyz_database_unavailable(self):
+        """Test the readiness endpoint fails without a database"""
+        with patch('core.health.probe_database') as probe:
+            probe.side_effect = OperationalError('connection refused')
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['status'], 'unavailable')
+        self.assertEqual(res.json()['error'], 'OperationalError')
+
+    @override_settings(READY_MAX_DB_LATENCY=0.5)
+    def test_readyz_database_slow(self):
+        """Test the readiness endpoint fails when the database is slow"""
+        with patch('core.health.probe_database', return_value=0.8):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['status'], 'slow')
+        self.assertEqual(res.json()['latency_ms'], 800)
+
+    def test_readyz_rejects_writes(self):
+        """Test the health endpoints only answer safe methods"""
+        res = self.client.post(READYZ_URL)
+
+        self.assertEqual(res.status_code, 405)
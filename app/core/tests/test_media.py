@@ -0,0 +1,143 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+CONTENT = b'0123456789'
+HASHED_NAME = 'uploads/recipe/ab/cd/abcd' + '0' * 60 + '.jpg'
+
+
+def media_url(path):
+    """Return the URL serving a media file"""
+    return reverse('media', args=[path])
+
+
+class MediaServingTests(TestCase):
+    """Test serving files from MEDIA_ROOT"""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(
+            MEDIA_ROOT=self.media.name,
+            MEDIA_SERVE_MODE='django'
+        )
+        self.override.enable()
+        for name in ('uploads/recipe/legacy.jpg', HASHED_NAME):
+            path = os.path.join(self.media.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as stored:
+                stored.write(CONTENT)
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def test_serve_file(self):
+        """Test files are streamed with validators"""
+        res = self.client.get(media_url('uploads/recipe/legacy.jpg'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_serve_file_not_modified(self):
+        """Test a matching ETag is answered with 304"""
+        url = media_url('uploads/recipe/legacy.jpg')
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_serve_content_addressed_immutable(self):
+        """Test content addressed files are cached as immutable"""
+        res = self.client.get(media_url(HASHED_NAME))
+
+        self.assertEqual(res.status_code, 200)
+        directives = {
+            directive.strip()
+            for directive in res['Cache-Control'].split(',')
+        }
+        self.assertEqual(
+            directives,
+            {'public', 'max-age=31536000', 'immutable'}
+        )
+
+    def test_serve_range(self):
+        """Test single byte ranges are served with 206"""
+        url = media_url('uploads/recipe/legacy.jpg')
+        for header, content, content_range in (
+            ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+            ('bytes=7-', b'789', 'bytes 7-9/10'),
+            ('bytes=-3', b'789', 'bytes 7-9/10'),
+            ('bytes=8-20', b'89', 'bytes 8-9/10'),
+        ):
+            res = self.client.get(url, HTTP_RANGE=header)
+
+            self.assertEqual(res.status_code, 206)
+            self.assertEqual(b''.join(res.streaming_content), content)
+            self.assertEqual(res['Content-Range'], content_range)
+            self.assertEqual(res['Content-Length'], str(len(content)))
+
+    def test_serve_range_unsatisfiable(self):
+        """Test ranges past the end of the file are answered with 416"""
+        res = self.client.get(
+            media_url('uploads/recipe/legacy.jpg'),
+            HTTP_RANGE='bytes=10-'
+        )
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */10')
+
+    def test_serve_range_stale_if_range(self):
+        """Test a range is ignored when If-Range no longer matches"""
+        res = self.client.get(
+            media_url('uploads/recipe/legacy.jpg'),
+            HTTP_RANGE='bytes=2-5',
+            HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+
+    @override_settings(
+        MEDIA_SERVE_MODE='x-accel-redirect',
+        MEDIA_ACCEL_PREFIX='/protected-media/'
+    )
+    def test_serve_x_accel_redirect(self):
+        """Test files are handed over to nginx with X-Accel-Redirect"""
+        res = self.client.get(media_url(HASHED_NAME))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/{HASHED_NAME}'
+        )
+        self.assertIn('immutable', res['Cache-Control'])
+
+    @override_settings(MEDIA_SERVE_MODE='x-sendfile')
+    def test_serve_x_sendfile(self):
+        """Test files are handed over with the X-Sendfile path"""
+        res = self.client.get(media_url('uploads/recipe/legacy.jpg'))
+
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Sendfile'],
+            os.path.join(self.media.name, 'uploads/recipe/legacy.jpg')
+        )
+
+    def test_serve_missing_file(self):
+        """Test missing files and paths outside MEDIA_ROOT are 404"""
+        for path in ('uploads/recipe/missing.jpg', '../etc/passwd'):
+            res = self.client.get(media_url(path))
+
+            self.assertEqual(res.status_code, 404)
@@ -0,0 +1,73 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from core import models
+
+
+user_scoped_indexes = import_module('core.migrations.0008_user_scoped_indexes')
+
+
+class MergeDuplicatesTests(TestCase):
+    """Test merging duplicate tags and ingredients before indexing"""
+
+    def setUp(self):
+        # Dropped inside the test's transaction, so restored afterwards
+        with connection.cursor() as cursor:
+            for table in ('core_tag', 'core_ingredient'):
+                cursor.execute(
+                    f'ALTER TABLE {table} '
+                    f'DROP CONSTRAINT {table}_user_name_uniq'
+                )
+        self.user = get_user_model().objects.create_user(
+            'test@user.com',
+            'testpass'
+        )
+
+    def sample_recipe(self, title):
+        """Create a recipe of the user"""
+        return models.Recipe.objects.create(
+            user=self.user,
+            title=title,
+            time_minutes=5,
+            price=1
+        )
+
+    def test_merge_duplicates(self):
+        """Test duplicates are merged into the oldest row with its links"""
+        tags = [
+            models.Tag.objects.create(user=self.user, name='Vegan')
+            for _ in range(3)
+        ]
+        other = get_user_model().objects.create_user(
+            'other@user.com',
+            'testpass'
+        )
+        other_tag = models.Tag.objects.create(user=other, name='Vegan')
+        ingredients = [
+            models.Ingredient.objects.create(user=self.user, name='Salt')
+            for _ in range(2)
+        ]
+        recipe1 = self.sample_recipe('Soup')
+        recipe1.tags.add(tags[0], tags[1])
+        recipe1.ingredients.add(*ingredients)
+        recipe2 = self.sample_recipe('Stew')
+        recipe2.tags.add(tags[2])
+        recipe2.ingredients.add(ingredients[1])
+
+        user_scoped_indexes.merge_duplicates(apps, None)
+
+        self.assertEqual(
+            sorted(models.Tag.objects.values_list('id', flat=True)),
+            [tags[0].id, other_tag.id]
+        )
+        self.assertEqual(
+            list(models.Ingredient.objects.values_list('id', flat=True)),
+            [ingredients[0].id]
+        )
+        for recipe in (recipe1, recipe2):
+            self.assertEqual(list(recipe.tags.all()), [tags[0]])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredients[0]])
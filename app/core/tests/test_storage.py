@@ -0,0 +1,154 @@
+import hashlib
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+
+from core import models
+from core.storage import image_storage
+
+
+IMAGE_BYTES = b'not really an image'
+IMAGE_HASH = hashlib.sha256(IMAGE_BYTES).hexdigest()
+
+
+class ContentAddressedStorageTests(TransactionTestCase):
+    """Test the content addressed recipe image storage"""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name)
+        self.override.enable()
+        self.user = get_user_model().objects.create_user(
+            'test@user.com',
+            'testpassword'
+        )
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def sample_recipe(self, image=IMAGE_BYTES):
+        """Create a recipe with an image holding the given bytes"""
+        recipe = models.Recipe.objects.create(
+            user=self.user,
+            title='Sample Recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.image.save('photo.JPG', ContentFile(image))
+
+        return recipe
+
+    def refs(self, name):
+        """Return the reference count of a stored image"""
+        return models.ImageBlob.objects.get(name=name).refs
+
+    def test_image_named_by_content(self):
+        """Test images are stored under the hash of their content"""
+        recipe = self.sample_recipe()
+
+        self.assertEqual(
+            recipe.image.name,
+            f'uploads/recipe/{IMAGE_HASH[:2]}/{IMAGE_HASH[2:4]}/'
+            f'{IMAGE_HASH}.jpg'
+        )
+        with open(recipe.image.path, 'rb') as stored:
+            self.assertEqual(stored.read(), IMAGE_BYTES)
+
+    def test_identical_images_stored_once(self):
+        """Test identical images share one file and count references"""
+        recipe1 = self.sample_recipe()
+        recipe2 = self.sample_recipe()
+
+        self.assertEqual(recipe1.image.name, recipe2.image.name)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(recipe1.image.path))),
+            1
+        )
+        self.assertEqual(self.refs(recipe1.image.name), 2)
+
+    def test_deleted_recipe_releases_image(self):
+        """Test the file is deleted along with its last reference"""
+        recipe1 = self.sample_recipe()
+        recipe2 = self.sample_recipe()
+        path = recipe1.image.path
+        rendition = os.path.splitext(path)[0] + '_thumbnail.jpg'
+        with open(rendition, 'wb') as stored:
+            stored.write(b'thumbnail')
+
+        recipe1.delete()
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.refs(recipe2.image.name), 1)
+
+        recipe2.delete()
+
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(rendition))
+        self.assertFalse(models.ImageBlob.objects.exists())
+
+    def test_release_rolled_back_keeps_image(self):
+        """Test the file outlives a rolled back release of it"""
+        recipe = self.sample_recipe()
+        path = recipe.image.path
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            recipe.delete()
+            raise RuntimeError
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.refs(recipe.image.name), 1)
+
+    def test_released_image_stored_again_kept(self):
+        """Test a file stored again before its release commits is kept"""
+        recipe = self.sample_recipe()
+        path = recipe.image.path
+
+        with transaction.atomic():
+            recipe.delete()
+            self.assertTrue(os.path.exists(path))
+            self.sample_recipe()
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.refs(recipe.image.name), 1)
+
+    def test_replaced_image_released(self):
+        """Test replacing a recipe's image releases the previous one"""
+        recipe = self.sample_recipe()
+        path = recipe.image.path
+
+        recipe.image.save('photo.jpg', ContentFile(b'another image'))
+
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(recipe.image.path))
+        self.assertEqual(
+            list(models.ImageBlob.objects.values_list('name', flat=True)),
+            [recipe.image.name]
+        )
+
+    def test_same_image_uploaded_again_released(self):
+        """Test re-uploading the same image keeps one reference"""
+        recipe = self.sample_recipe()
+        path = recipe.image.path
+
+        for _ in range(2):
+            recipe.image.save('photo.jpg', ContentFile(IMAGE_BYTES))
+
+        self.assertEqual(self.refs(recipe.image.name), 1)
+        recipe.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(models.ImageBlob.objects.exists())
+
+    def test_saving_unchanged_image_keeps_reference(self):
+        """Test saving a recipe without changing its image keeps it"""
+        recipe = self.sample_recipe()
+        recipe.title = 'Renamed'
+
+        recipe.save()
+
+        self.assertTrue(image_storage.exists(recipe.image.name))
+        self.assertEqual(self.refs(recipe.image.name), 1)
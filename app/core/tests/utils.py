@@ -0,0 +1,23 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def capture_on_commit_callbacks(using=DEFAULT_DB_ALIAS, execute=False):
+    """Capture the on_commit callbacks registered inside a TestCase
+
+    A TestCase never commits, so its callbacks would never run. This is
+    Django 3.2's TestCase.captureOnCommitCallbacks() for Django 3.1.
+    """
+    callbacks = []
+    start_count = len(connections[using].run_on_commit)
+    try:
+        yield callbacks
+    finally:
+        callbacks[:] = [
+            func for _, func in connections[using].run_on_commit[start_count:]
+        ]
+        if execute:
+            for callback in callbacks:
+                callback()
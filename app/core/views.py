@@ -0,0 +1,221 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import DatabaseError
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from core import health
+from core.storage import is_content_addressed
+
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Headers handing a file over to the front proxy, by serving mode
+OFFLOAD_HEADERS = {
+    'x-accel-redirect': 'X-Accel-Redirect',
+    'x-sendfile': 'X-Sendfile',
+}
+
+
+class RangeFile:
+    """Read at most length bytes of a file from its current position
+
+    fileno() is kept so WSGI servers can still send the file with
+    sendfile(), which they bound by the response's Content-Length.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def byte_range(header, size):
+    """Return the first and last byte of a single range Range header
+
+    Returns None if the whole file should be sent, which is the case for
+    missing, malformed and multiple range headers. Raises ValueError if
+    the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        if not int(last) or not size:
+            raise ValueError('Empty suffix range')
+        return max(size - int(last), 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError('Range starts after the end of the file')
+    if end < start:
+        return None
+
+    return start, end
+
+
+def _offload_response(mode, path, full_path, content_type):
+    """Return a response telling the front proxy to send the file"""
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel-redirect':
+        location = settings.MEDIA_ACCEL_PREFIX + quote(path)
+    else:
+        location = full_path
+    response[OFFLOAD_HEADERS[mode]] = location
+
+    return response
+
+
+def _file_response(request, full_path, stat, etag, content_type):
+    """Return a streaming response of the file, or the requested range"""
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (etag, http_date(stat.st_mtime)):
+        header = None
+    try:
+        requested = byte_range(header, stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    file = open(full_path, 'rb')
+    if requested is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = requested
+        file.seek(start)
+        response = FileResponse(
+            RangeFile(file, end - start + 1),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT
+
+    With MEDIA_SERVE_MODE set to 'x-accel-redirect' or 'x-sendfile'
+    the file is handed over to the front proxy, otherwise it is
+    streamed with FileResponse, which WSGI servers send with
+    sendfile(), honouring single byte ranges. Content addressed files
+    are cached for a year as immutable, other files are revalidated
+    with their ETag and Last-Modified.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Media file not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Media file not found')
+
+    stat = os.stat(full_path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    content_type = mimetypes.guess_type(full_path)[0] or \
+        'application/octet-stream'
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        mode = settings.MEDIA_SERVE_MODE
+        if mode in OFFLOAD_HEADERS:
+            response = _offload_response(mode, path, full_path, content_type)
+        else:
+            response = _file_response(
+                request,
+                full_path,
+                stat,
+                etag,
+                content_type
+            )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if is_content_addressed(path):
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=IMMUTABLE_MAX_AGE,
+            immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+
+    return response
+
+
+@never_cache
+@require_safe
+def healthz(request):
+    """Report that the process serves requests, without a query"""
+    return JsonResponse({'status': 'ok', 'database': health.pool_state()})
+
+
+@never_cache
+@require_safe
+def readyz(request):
+    """Report whether the database answers quickly enough for traffic
+
+    Answers 503 while the database is unreachable or slower than
+    READY_MAX_DB_LATENCY seconds, so the worker is taken out of rotation.
+    """
+    state = health.pool_state()
+    try:
+        latency = health.probe_database()
+    except DatabaseError as exc:
+        return JsonResponse(
+            {
+                'status': 'unavailable',
+                'error': type(exc).__name__,
+                'database': state,
+            },
+            status=503
+        )
+
+    ready = latency <= getattr(settings, 'READY_MAX_DB_LATENCY', 1.0)
+    return JsonResponse(
+        {
+            'status': 'ok' if ready else 'slow',
+            'latency_ms': round(latency * 1000, 3),
+            'database': state,
+        },
+        status=200 if ready else 503
+    )
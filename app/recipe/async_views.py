@@ -0,0 +1,219 @@
+"""Async views for the recipe read endpoints
+
+Under ASGI these serve the recipe list and detail and the tag and
+ingredient lists on the event loop: authentication, queries and
+serialization never wait on the database in a thread. Cache calls use
+blocking sockets, so they run in worker threads instead. They reuse the
+viewsets for everything but running queries, so responses match the
+synchronous views. Requests they do not cover, such as writes, nested
+expansion or the browsable API, are passed on to the synchronous views.
+"""
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.urls import resolve
+from django.utils.cache import get_conditional_response
+
+from rest_framework.response import Response
+
+from core import aiodb
+
+from recipe.cache import LIST_CACHE_TIMEOUT, add_validators, \
+                         list_cache_key
+from recipe.views import fast_list_enabled
+
+
+SYNC_URLCONF = getattr(settings, 'SYNC_ROOT_URLCONF', 'app.urls')
+READ_METHODS = ('GET', 'HEAD')
+
+
+def _in_thread(func):
+    """Return an awaitable running a blocking call in a worker thread"""
+    return sync_to_async(func, thread_sensitive=False)
+
+
+async def _authenticate(request):
+    """Authenticate a DRF request with its authenticators' async methods"""
+    for authenticator in request.authenticators:
+        try:
+            if hasattr(authenticator, 'authenticate_async'):
+                result = await authenticator.authenticate_async(request)
+            else:
+                # Such as DRF's forced test authentication, in memory
+                result = authenticator.authenticate(request)
+        except Exception:
+            request._not_authenticated()
+            raise
+        if result is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = result
+            return
+
+    request._not_authenticated()
+
+
+def _validators(view, request):
+    """Return the ETag and Last-Modified values, or a 304 response
+
+    Reads the data version from the cache, so it runs in a thread.
+    """
+    etag, last_modified = view.conditional_validators(request)
+    not_modified = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified
+    )
+
+    return etag, last_modified, not_modified
+
+
+def _cached_list(view, request):
+    """Return the validators, cache key and cached data of a list"""
+    etag, last_modified, not_modified = _validators(view, request)
+    if not_modified is not None:
+        return etag, last_modified, not_modified, None, None
+
+    key = list_cache_key(request)
+    return etag, last_modified, None, key, cache.get(key)
+
+
+async def _list_data(view, request):
+    """Return the data of a list response"""
+    rows = view.fast_rows(view.filter_queryset(view.get_queryset()))
+    page_rows = view.paginator.page_queryset(rows, request, view)
+    if page_rows is None:
+        return await _represent(view, await aiodb.fetch_values(rows))
+
+    page = view.paginator.paginate_rows(await aiodb.fetch_values(page_rows))
+    return view.get_paginated_response(await _represent(view, page)).data
+
+
+async def _represent(view, rows):
+    """Represent rows like FastListMixin.fast_represent()"""
+    linked = {
+        name: await aiodb.fetch_values(query)
+        for name, query in view.fast_linked_queries(rows).items()
+    }
+
+    return view.fast_build(rows, linked)
+
+
+async def list_response(view, request):
+    """Serve a list like the viewset's list(), or None to defer to it"""
+    if not fast_list_enabled() or not view.use_fast_list():
+        return None
+
+    etag, last_modified, not_modified, key, data = await _in_thread(
+        _cached_list
+    )(view, request)
+    if not_modified is not None:
+        return not_modified
+
+    if data is None:
+        data = await _list_data(view, request)
+        await _in_thread(cache.set)(key, data, LIST_CACHE_TIMEOUT)
+
+    return add_validators(Response(data), etag, last_modified)
+
+
+async def retrieve_response(view, request):
+    """Serve a detail like the viewset's retrieve()"""
+    etag, last_modified, not_modified = await _in_thread(_validators)(
+        view,
+        request
+    )
+    if not_modified is not None:
+        return not_modified
+
+    queryset = view.filter_queryset(view.get_queryset())
+    try:
+        queryset = queryset.filter(**{
+            view.lookup_field: view.kwargs[view.lookup_url_kwarg or
+                                           view.lookup_field]
+        })
+    except (TypeError, ValueError, ValidationError):
+        raise Http404
+
+    instances = await aiodb.fetch_instances(queryset)
+    if not instances:
+        raise Http404
+    instance = instances[0]
+    view.check_object_permissions(request, instance)
+    await aiodb.fetch_related(instance, queryset._prefetch_related_lookups)
+
+    return add_validators(
+        Response(view.get_serializer(instance).data),
+        etag,
+        last_modified
+    )
+
+
+def _plain(response):
+    """Copy a rendered response, which Django would render in a thread"""
+    plain = HttpResponse(
+        response.rendered_content,
+        status=response.status_code
+    )
+    for header, value in response.items():
+        plain[header] = value
+
+    return plain
+
+
+def read_view(respond):
+    """Return an async view serving a read action of the synchronous view
+
+    The viewset and its action are those of the synchronous view of the
+    request path. ``respond`` is awaited with the initialized view and
+    DRF request and returns the response, or None to defer to the
+    synchronous view.
+    """
+    async def view_func(request, *args, **kwargs):
+        match = resolve(request.path_info, urlconf=SYNC_URLCONF)
+        sync_view = sync_to_async(match.func)
+        if request.method not in READ_METHODS or not aiodb.available():
+            return await sync_view(request, *match.args, **match.kwargs)
+
+        # Set up the view the way ViewSetMixin.as_view() does
+        view = match.func.cls(**match.func.initkwargs)
+        view.action_map = dict(match.func.actions)
+        view.action_map.setdefault('head', view.action_map['get'])
+        for method, action in view.action_map.items():
+            setattr(view, method, getattr(view, action))
+        view.args = match.args
+        view.kwargs = match.kwargs
+        view.headers = view.default_response_headers
+        drf_request = view.initialize_request(request)
+        view.request = drf_request
+        try:
+            await _authenticate(drf_request)
+            view.initial(drf_request, *match.args, **match.kwargs)
+            if drf_request.accepted_renderer.format == 'json':
+                response = await respond(view, drf_request)
+            else:
+                response = None
+            if response is None:
+                return await sync_view(request, *match.args, **match.kwargs)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+
+        response = view.finalize_response(
+            drf_request,
+            response,
+            *match.args,
+            **match.kwargs
+        )
+        if isinstance(response, Response):
+            response = _plain(response)
+
+        return response
+
+    view_func.csrf_exempt = True
+    return view_func
+
+
+list_view = read_view(list_response)
+detail_view = read_view(retrieve_response)
@@ -0,0 +1,130 @@
+from django.db import connection, transaction
+from django.db.models import Max
+
+from core import models
+
+from recipe.cache import bump_version
+from recipe.filters import recipe_links
+from recipe.search import update_search_vectors
+
+
+BULK_RELATIONS = {
+    'tags': models.Tag,
+    'ingredients': models.Ingredient,
+}
+
+
+def _owned_ids(user, items):
+    """Return the IDs referenced by items that belong to user, per field"""
+    owned = {}
+    for field, model in BULK_RELATIONS.items():
+        requested = {pk for item in items for pk in item.get(field, ())}
+        owned[field] = set(model.objects.filter(
+            user=user,
+            id__in=requested
+        ).values_list('id', flat=True))
+
+    return owned
+
+
+def validate_recipes(user, serializers):
+    """Validate bulk items, resolving related IDs with one query each
+
+    Returns the validated data of each item (None when invalid) and the
+    errors of the invalid items keyed by their index.
+    """
+    errors = {}
+    for index, serializer in enumerate(serializers):
+        if not serializer.is_valid():
+            errors[index] = serializer.errors
+
+    valid = [s.validated_data for s in serializers if s.is_valid()]
+    owned = _owned_ids(user, valid)
+    validated = []
+    for index, serializer in enumerate(serializers):
+        if index in errors:
+            validated.append(None)
+            continue
+
+        item = serializer.validated_data
+        for field in BULK_RELATIONS:
+            missing = sorted(set(item.get(field, ())) - owned[field])
+            if missing:
+                errors.setdefault(index, {})[field] = [
+                    f'Invalid pk "{pk}" - object does not exist.'
+                    for pk in missing
+                ]
+        validated.append(None if index in errors else item)
+
+    return validated, errors
+
+
+def _read_back_ids(recipes):
+    """Number recipes inserted by a backend that returns no IDs
+
+    The database assigns the IDs itself, so its sequence stays in step.
+    The insert takes SQLite's database write lock, held until the
+    transaction ends, so the just inserted rows are the last ones and
+    were numbered consecutively in order.
+    """
+    last_id = models.Recipe.objects.aggregate(last_id=Max('id'))['last_id']
+    for offset, recipe in enumerate(reversed(recipes)):
+        recipe.id = last_id - offset
+
+
+def create_recipes(user, items):
+    """Insert recipes and their links with one statement per table
+
+    Returns the created recipes in the order of items.
+    """
+    recipes = [
+        models.Recipe(user=user, **{
+            name: value for name, value in item.items()
+            if name not in BULK_RELATIONS
+        })
+        for item in items
+    ]
+
+    with transaction.atomic():
+        models.Recipe.objects.bulk_create(recipes)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            _read_back_ids(recipes)
+        for field in BULK_RELATIONS:
+            links, column = recipe_links(field)
+            links.bulk_create([
+                links.model(recipe_id=recipe.id, **{column: pk})
+                for recipe, item in zip(recipes, items)
+                for pk in set(item.get(field, ()))
+            ])
+        update_search_vectors(
+            models.Recipe.objects.filter(id__in=[r.id for r in recipes])
+        )
+
+    bump_version(user.id)
+    return recipes
+
+
+def get_or_create_by_names(model, user, names):
+    """Return a user's tags or ingredients with the given names
+
+    Missing rows are inserted with a single ON CONFLICT DO NOTHING
+    statement backed by the (user, name) unique constraint, so
+    concurrent batches naming the same objects do not fail.
+    """
+    names = list(dict.fromkeys(names))
+    queryset = model.objects.filter(user=user)
+    found = dict(
+        queryset.filter(name__in=names).values_list('name', 'id')
+    )
+    missing = [name for name in names if name not in found]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True
+        )
+        found.update(
+            queryset.filter(name__in=missing).values_list('name', 'id')
+        )
+        bump_version(user.id)
+
+    return [{'id': found[name], 'name': name} for name in names]
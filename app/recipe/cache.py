@@ -0,0 +1,117 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from rest_framework.response import Response
+
+from core.cache import advance_version, current_version
+
+
+LIST_CACHE_TIMEOUT = getattr(settings, 'RECIPE_LIST_CACHE_TIMEOUT', 300)
+
+
+def _version_key(user_id):
+    """Return the cache key holding a user's recipe data version"""
+    return f'recipe:version:{user_id}'
+
+
+def data_version(user_id):
+    """Return the current version of a user's recipe data"""
+    return current_version(_version_key(user_id))
+
+
+def bump_version(user_id):
+    """Invalidate every cached response for a user's recipe data
+
+    The version also serves as the Last-Modified time of the user's
+    data. It is kept in the cache shared by all workers, so a write
+    handled by one of them invalidates the responses cached by the
+    others once it commits.
+    """
+    advance_version(_version_key(user_id))
+
+
+def list_cache_key(request):
+    """Return the cache key for a list request by the current user"""
+    uri = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    version = data_version(request.user.id)
+    return f'recipe:list:{request.user.id}:{version}:{uri}'
+
+
+def add_validators(response, etag, last_modified):
+    """Add the ETag and, when known, Last-Modified headers to a response"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+
+    return response
+
+
+class CachedListMixin:
+    """Serve list responses from the cache until the user's data changes"""
+
+    def list(self, request, *args, **kwargs):
+        key = list_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data, LIST_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalGetMixin:
+    """Answer conditional GETs from the user's data version
+
+    The ETag and Last-Modified values are derived from the version
+    alone, so a matching request gets a 304 without touching the
+    database or serializing anything.
+    """
+
+    def conditional_validators(self, request):
+        """Return the ETag and Last-Modified time of the response"""
+        version = data_version(request.user.id)
+        representation = (
+            f'{version}:{request.accepted_renderer.format}:'
+            f'{request.build_absolute_uri()}'
+        )
+        etag = '"%s"' % hashlib.sha1(representation.encode()).hexdigest()
+
+        # Last-Modified only resolves seconds, so another change in the
+        # same second would be answered 304 from If-Modified-Since. It is
+        # left out until the second of the last change is over, after
+        # which any new change falls in a later second.
+        last_modified = version // 10 ** 9
+        if time.time_ns() // 10 ** 9 <= last_modified:
+            last_modified = None
+
+        return etag, last_modified
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.conditional_validators(request)
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        return add_validators(
+            handler(request, *args, **kwargs),
+            etag,
+            last_modified
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            super().list,
+            *args,
+            **kwargs
+        )
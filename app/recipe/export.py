@@ -0,0 +1,109 @@
+import csv
+import json
+from itertools import islice
+
+from core import models
+
+from recipe.filters import recipe_links
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_COLUMNS = ('id', 'title', 'time_minutes', 'price', 'link')
+EXPORT_RELATIONS = {
+    'tags': 'tag__name',
+    'ingredients': 'ingredient__name',
+}
+CSV_LIST_SEPARATOR = '|'
+
+
+def join_csv_names(names):
+    """Join names into one CSV cell, escaping separators in them"""
+    return CSV_LIST_SEPARATOR.join(
+        name.replace('\\', '\\\\').replace(
+            CSV_LIST_SEPARATOR,
+            '\\' + CSV_LIST_SEPARATOR
+        )
+        for name in names
+    )
+
+
+def split_csv_names(value):
+    """Split a CSV cell made by join_csv_names() back into names"""
+    names, name = [], []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            name.append(next(chars, ''))
+        elif char == CSV_LIST_SEPARATOR:
+            names.append(''.join(name))
+            name = []
+        else:
+            name.append(char)
+    names.append(''.join(name))
+
+    return names
+
+
+def _linked_names(field, recipe_ids):
+    """Return the related names of each recipe, keyed by recipe ID"""
+    links, column = recipe_links(field)
+    names = {}
+    rows = links.filter(recipe_id__in=recipe_ids).order_by(
+        'recipe_id', column
+    ).values_list('recipe_id', EXPORT_RELATIONS[field])
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+
+    return names
+
+
+def export_rows(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield every recipe of user with its tag and ingredient names
+
+    Recipes are read through a server side cursor and names are fetched
+    with one query per relation for each chunk, so memory use does not
+    depend on the size of the library.
+    """
+    rows = models.Recipe.objects.filter(user=user).order_by('id').values(
+        *EXPORT_COLUMNS
+    ).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        recipe_ids = [row['id'] for row in chunk]
+        linked = {
+            field: _linked_names(field, recipe_ids)
+            for field in EXPORT_RELATIONS
+        }
+        for row in chunk:
+            row['price'] = str(row['price'])
+            for field, names in linked.items():
+                row[field] = names.get(row['id'], [])
+            yield row
+
+
+def ndjson_lines(rows):
+    """Yield rows as newline delimited JSON"""
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+class _Echo:
+    """File-like object returning what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """Yield a header line followed by rows as CSV"""
+    writer = csv.writer(_Echo())
+    header = EXPORT_COLUMNS + tuple(EXPORT_RELATIONS)
+    yield writer.writerow(header)
+    for row in rows:
+        for field in EXPORT_RELATIONS:
+            row[field] = join_csv_names(row[field])
+        yield writer.writerow([row[name] for name in header])
@@ -0,0 +1,99 @@
+from django.db.models import Count, Exists, IntegerField, OuterRef, \
+                             Subquery
+from django.db.models.functions import Coalesce
+
+from rest_framework.exceptions import ValidationError
+
+from core import models
+
+
+MAX_FILTER_IDS = 50
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+RELATED_COLUMNS = {
+    'tags': 'tag_id',
+    'ingredients': 'ingredient_id',
+}
+
+
+def recipe_links(field):
+    """Return the through table queryset and related column for field"""
+    through = getattr(models.Recipe, field).through
+    return through.objects.all(), RELATED_COLUMNS[field]
+
+
+def params_to_ints(param, value):
+    """Convert a comma separated list of IDs into a set of integers"""
+    try:
+        ids = {int(str_id) for str_id in value.split(',') if str_id.strip()}
+    except ValueError:
+        raise ValidationError(
+            {param: 'Expected a comma separated list of IDs'}
+        )
+
+    if len(ids) > MAX_FILTER_IDS:
+        raise ValidationError(
+            {param: f'No more than {MAX_FILTER_IDS} IDs may be given'}
+        )
+
+    return ids
+
+
+def params_to_names(param, value, allowed):
+    """Convert a comma separated list of names, rejecting unknown ones"""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = set(names) - set(allowed)
+    if unknown:
+        raise ValidationError(
+            {param: f'Unknown names: {", ".join(sorted(unknown))}'}
+        )
+
+    return names
+
+
+def param_to_mode(param, value):
+    """Validate a match mode query parameter"""
+    mode = value or MATCH_ANY
+    if mode not in MATCH_MODES:
+        raise ValidationError({param: f'Expected one of {MATCH_MODES}'})
+
+    return mode
+
+
+def filter_recipes_by_related(queryset, field, ids, mode=MATCH_ANY):
+    """Filter recipes linked to any or all of ids through the field M2M
+
+    Both modes read only the through table and never join it into the
+    outer query, so each recipe is returned at most once.
+    """
+    links, column = recipe_links(field)
+    links = links.filter(**{f'{column}__in': ids})
+
+    if mode == MATCH_ALL:
+        matching = links.values('recipe_id').annotate(
+            matched=Count(column)
+        ).filter(matched=len(ids)).values('recipe_id')
+        return queryset.filter(id__in=matching)
+
+    return queryset.filter(Exists(links.filter(recipe_id=OuterRef('pk'))))
+
+
+def filter_assigned(queryset, field):
+    """Filter tags or ingredients used by at least one recipe"""
+    links, column = recipe_links(field)
+    return queryset.filter(Exists(links.filter(**{column: OuterRef('pk')})))
+
+
+def annotate_recipe_count(queryset, field):
+    """Annotate tags or ingredients with the number of recipes using them"""
+    links, column = recipe_links(field)
+    counts = links.filter(**{column: OuterRef('pk')}).order_by().values(
+        column
+    ).annotate(count=Count('recipe_id')).values('count')
+
+    return queryset.annotate(recipe_count=Coalesce(
+        Subquery(counts, output_field=IntegerField()),
+        0
+    ))
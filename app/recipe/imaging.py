@@ -0,0 +1,137 @@
+"""Image processing run in worker processes
+
+This module only depends on Pillow so worker processes can import it
+without setting up Django.
+"""
+import os
+
+from PIL import Image
+
+
+RENDITIONS = {
+    'thumbnail': {'size': (200, 200), 'format': 'JPEG', 'ext': 'jpg'},
+    'medium': {'size': (800, 800), 'format': 'JPEG', 'ext': 'jpg'},
+    'webp': {'size': (800, 800), 'format': 'WEBP', 'ext': 'webp'},
+}
+QUALITY = 80
+
+# Modes Pillow resizes directly; the others are converted first
+RESIZE_MODES = ('L', 'RGB', 'RGBA')
+
+
+class ImageRejected(Exception):
+    """Raised when an image is over the ingest limits"""
+
+
+def rendition_name(name, rendition):
+    """Return the storage name of a rendition of the image name"""
+    stem = os.path.splitext(name)[0]
+    return f'{stem}_{rendition}.{RENDITIONS[rendition]["ext"]}'
+
+
+def render_renditions(source_path, name):
+    """Write every rendition next to the source image
+
+    Returns the storage names of the renditions keyed by rendition.
+    """
+    directory = os.path.dirname(source_path)
+    names = {}
+    with Image.open(source_path) as source:
+        source = source.convert('RGB')
+        for rendition, spec in RENDITIONS.items():
+            image = source.copy()
+            image.thumbnail(spec['size'])
+            names[rendition] = rendition_name(name, rendition)
+            image.save(
+                os.path.join(directory, os.path.basename(names[rendition])),
+                format=spec['format'],
+                quality=QUALITY,
+                optimize=True
+            )
+
+    return names
+
+
+def _bytes_per_pixel(mode):
+    """Return the bytes Pillow stores for a pixel of the mode"""
+    if mode in ('1', 'L', 'P'):
+        return 1
+    if mode.startswith('I;16'):
+        return 2
+    return 4
+
+
+def decode_cost(mode, size, target):
+    """Estimate the bytes of pixel buffers used to downscale an image
+
+    Counts the decoded source, its conversion to a mode Pillow can
+    resize, and both passes of the resize to the target size.
+    """
+    width, height = size
+    cost = width * height * _bytes_per_pixel(mode)
+    if mode not in RESIZE_MODES:
+        cost += width * height * 4
+    return cost + (target[0] * height + target[0] * target[1]) * 4
+
+
+def fit_size(size, max_dimension):
+    """Return the size scaled down to fit within max_dimension"""
+    width, height = size
+    scale = max_dimension / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def fit_image(source, output, max_pixels, max_dimension, memory_limit):
+    """Check an image against the limits, downscaling it into output
+
+    Only the header is read unless the image is larger than
+    max_dimension. JPEGs are then decoded at a reduced scale where
+    possible. Returns True if a downscaled copy was written to output,
+    False if the image can be kept as is or is not an image Pillow can
+    open. Raises ImageRejected if the image is over max_pixels, if
+    downscaling it would need more than memory_limit bytes, or if it is
+    in a format Pillow cannot write.
+    """
+    try:
+        image = Image.open(source)
+    except Image.DecompressionBombError as exc:
+        raise ImageRejected(str(exc))
+    except OSError:
+        return False
+
+    with image:
+        width, height = image.size
+        if width * height > max_pixels:
+            raise ImageRejected(
+                f'Image is {width}x{height} pixels, '
+                f'the limit is {max_pixels} pixels.'
+            )
+        if max(width, height) <= max_dimension:
+            return False
+
+        target = fit_size(image.size, max_dimension)
+        image.draft(None, target)
+        if decode_cost(image.mode, image.size, target) > memory_limit:
+            raise ImageRejected(
+                f'Image is {width}x{height} pixels, '
+                f'which is too large to downscale.'
+            )
+
+        fmt = image.format
+        if image.mode not in RESIZE_MODES:
+            has_alpha = 'A' in image.getbands() or 'transparency' in \
+                image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        resized = image.resize(target, Image.LANCZOS)
+        if fmt == 'JPEG' and resized.mode == 'RGBA':
+            resized = resized.convert('RGB')
+        try:
+            resized.save(output, format=fmt, quality=QUALITY)
+        except (OSError, KeyError, ValueError):
+            # Pillow reads some formats, such as PSD, it cannot write
+            raise ImageRejected(
+                f'Image is {width}x{height} pixels and {fmt} images '
+                f'cannot be downscaled.'
+            )
+
+    return True
@@ -0,0 +1,136 @@
+import hashlib
+import os
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, \
+    UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from rest_framework import exceptions, serializers, status
+
+from recipe import imaging
+
+
+LIMITS = {
+    'RECIPE_IMAGE_MAX_BYTES': 20 * 1024 * 1024,
+    'RECIPE_IMAGE_MAX_PIXELS': 50 * 1000 * 1000,
+    'RECIPE_IMAGE_MAX_DIMENSION': 4096,
+    'RECIPE_IMAGE_MEMORY_LIMIT': 128 * 1024 * 1024,
+}
+
+# Room for the multipart boundaries and headers around the image
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def limit(name):
+    """Return the configured value of an ingest limit"""
+    return getattr(settings, name, LIMITS[name])
+
+
+class ImageTooLarge(exceptions.APIException):
+    """Raised when an upload is over the byte limit"""
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Image upload is too large.'
+    default_code = 'image_too_large'
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to disk in chunks, stopping at the byte limit
+
+    The SHA-256 of each file is computed while it streams and kept on
+    the uploaded file as ``content_hash`` for the content addressed
+    image storage.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = limit('RECIPE_IMAGE_MAX_BYTES')
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.max_bytes + MULTIPART_OVERHEAD:
+            raise ImageTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.sha = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.file.close()
+            raise ImageTooLarge()
+        self.sha.update(raw_data)
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.sha.hexdigest()
+
+        return file
+
+
+def ingest_image(upload):
+    """Check an uploaded image against the limits
+
+    Returns the upload, or a downscaled copy of it if it is larger than
+    RECIPE_IMAGE_MAX_DIMENSION. Raises a ValidationError if the image is
+    over RECIPE_IMAGE_MAX_PIXELS or downscaling it would need more than
+    RECIPE_IMAGE_MEMORY_LIMIT bytes of pixel buffers.
+    """
+    output = TemporaryUploadedFile(
+        upload.name,
+        upload.content_type,
+        0,
+        upload.charset,
+        upload.content_type_extra
+    )
+    if hasattr(upload, 'temporary_file_path'):
+        source = upload.temporary_file_path()
+    else:
+        source = upload
+    try:
+        fitted = imaging.fit_image(
+            source,
+            output.file,
+            limit('RECIPE_IMAGE_MAX_PIXELS'),
+            limit('RECIPE_IMAGE_MAX_DIMENSION'),
+            limit('RECIPE_IMAGE_MEMORY_LIMIT')
+        )
+    except imaging.ImageRejected as exc:
+        output.close()
+        raise serializers.ValidationError({'image': [str(exc)]})
+
+    if not fitted:
+        output.close()
+        upload.seek(0)
+        return upload
+
+    output.file.flush()
+    output.size = os.path.getsize(output.temporary_file_path())
+    output.seek(0)
+    return output
+
+
+@contextmanager
+def ingested(data):
+    """Yield the request data with its image passed through ingest_image
+
+    A downscaled copy is closed, removing it from disk unless it was
+    moved into storage, when the block exits.
+    """
+    upload = data.get('image')
+    if not isinstance(upload, UploadedFile):
+        yield data
+        return
+
+    image = ingest_image(upload)
+    try:
+        yield {'image': image}
+    finally:
+        if image is not upload:
+            image.close()
@@ -0,0 +1,125 @@
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination split around the query for the page
+
+    page_queryset() returns the queryset of the page without running it
+    and paginate_rows() builds the page from its rows, so async views
+    can run the query in between. paginate_queryset() does both, like
+    CursorPagination.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+
+        return self.paginate_rows(list(queryset))
+
+    def page_queryset(self, queryset, request, view=None):
+        """Return the queryset of the requested page, plus one row"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        # Cursor pagination always enforces an ordering.
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        # If we have a cursor with a fixed position then filter by that.
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+
+            # Test for: (cursor reversed) XOR (queryset reversed)
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + '__lt': current_position}
+            else:
+                kwargs = {order_attr + '__gt': current_position}
+
+            queryset = queryset.filter(**kwargs)
+
+        self.position = (offset, reverse, current_position)
+
+        # One extra row tells whether a page follows this one
+        return queryset[offset:offset + self.page_size + 1]
+
+    def paginate_rows(self, results):
+        """Return the page from the rows of page_queryset()"""
+        offset, reverse, current_position = self.position
+        self.page = list(results[:self.page_size])
+
+        # Determine the position of the final item following the page.
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1],
+                self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # The query ordering was reversed, so reverse the page back
+            self.page = list(reversed(self.page))
+
+            # Determine next and previous positions for reverse cursors.
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            # Determine next and previous positions for forward cursors.
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        # Display page controls in the browsable API if there is more
+        # than one page.
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class RecipeAttrPagination(KeysetPagination):
+    """Keyset pagination for tags and ingredients"""
+    ordering = ('-name', 'id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class RecipePagination(KeysetPagination):
+    """Keyset pagination for recipes"""
+    ordering = ('-id',)
+    search_ordering = ('-search_rank', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        """Order ranked search results by relevance"""
+        if 'search_rank' in queryset.query.annotations:
+            return self.search_ordering
+
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,85 @@
+"""Fast list representations built from ``values()`` rows
+
+These produce the same output as the serializers in
+:mod:`recipe.serializers` for list actions without instantiating models
+or dispatching through serializer fields for every row.
+"""
+from decimal import Decimal
+
+from django.contrib.postgres.aggregates import ArrayAgg
+
+from core import models
+
+from recipe.filters import recipe_links
+
+
+RECIPE_COLUMNS = ('id', 'title', 'time_minutes', 'price', 'link')
+RECIPE_RELATIONS = ('ingredients', 'tags')
+PRICE_QUANTUM = Decimal(1).scaleb(
+    -models.Recipe._meta.get_field('price').decimal_places
+)
+
+
+def _format_price(value):
+    """Format a price the way DRF's DecimalField does by default"""
+    return '{:f}'.format(value.quantize(PRICE_QUANTUM))
+
+
+def attr_rows(queryset, with_counts=False):
+    """Return tag or ingredient rows ready to be rendered"""
+    columns = ('id', 'name', 'recipe_count') if with_counts else ('id', 'name')
+    return queryset.values(*columns)
+
+
+def recipe_rows(queryset, fields):
+    """Return the rows needed to represent recipes with the given fields"""
+    columns = ['id'] + [
+        name for name in fields if name in RECIPE_COLUMNS and name != 'id'
+    ]
+    if 'search_rank' in queryset.query.annotations:
+        columns.append('search_rank')
+
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def linked_ids_queries(recipe_ids, fields):
+    """Return the queries of the sorted related IDs of each recipe
+
+    Each query returns a row of ``recipe_id`` and ``ids`` per recipe
+    and is keyed by the relation it reads.
+    """
+    queries = {}
+    for field in RECIPE_RELATIONS:
+        if field not in fields:
+            continue
+        links, column = recipe_links(field)
+        queries[field] = links.filter(recipe_id__in=recipe_ids).values(
+            'recipe_id'
+        ).annotate(ids=ArrayAgg(column, ordering=column))
+
+    return queries
+
+
+def build_recipes(rows, fields, linked):
+    """Build the list representation of recipe rows
+
+    ``linked`` holds the rows of linked_ids_queries() by relation.
+    """
+    linked = {
+        field: {row['recipe_id']: row['ids'] for row in link_rows}
+        for field, link_rows in linked.items()
+    }
+
+    data = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            if name in linked:
+                item[name] = linked[name].get(row['id'], [])
+            elif name == 'price':
+                item[name] = _format_price(row[name])
+            else:
+                item[name] = row[name]
+        data.append(item)
+
+    return data
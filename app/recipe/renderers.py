@@ -0,0 +1,23 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renderer for newline delimited JSON
+
+    Exports stream their own content, so this only renders error
+    responses as a single JSON line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode() + b'\n'
+
+
+class CSVRenderer(NDJSONRenderer):
+    """Renderer for comma separated values"""
+    media_type = 'text/csv'
+    format = 'csv'
@@ -0,0 +1,79 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from core import models
+from core.storage import image_storage
+
+from recipe.cache import bump_version
+from recipe.imaging import RENDITIONS, rendition_name, render_renditions
+
+
+_executor = None
+
+
+def _get_executor():
+    """Return the process pool rendering images, starting it if needed"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'RECIPE_RENDITION_WORKERS', 2),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    return _executor
+
+
+def _store(recipe, names):
+    """Record the renditions of a recipe image unless it was replaced"""
+    models.Recipe.objects.filter(
+        pk=recipe.pk,
+        image=recipe.image.name
+    ).update(image_renditions=names)
+    recipe.image_renditions = names
+    bump_version(recipe.user_id)
+
+
+def _stored(recipe, future):
+    """Store the result of a finished rendition job"""
+    close_old_connections()
+    try:
+        _store(recipe, future.result())
+    finally:
+        connection.close()
+
+
+def enqueue(recipe):
+    """Render the renditions of a recipe image in the background
+
+    Images are content addressed, so renditions already rendered for
+    the same image are reused. With RECIPE_RENDITIONS_ASYNC set to False
+    the renditions are rendered before returning, which is what the
+    tests use.
+    """
+    source_path = recipe.image.path
+    name = recipe.image.name
+    names = {
+        rendition: rendition_name(name, rendition)
+        for rendition in RENDITIONS
+    }
+    if all(image_storage.exists(stored) for stored in names.values()):
+        _store(recipe, names)
+        return
+
+    if not getattr(settings, 'RECIPE_RENDITIONS_ASYNC', True):
+        _store(recipe, render_renditions(source_path, name))
+        return
+
+    future = _get_executor().submit(render_renditions, source_path, name)
+    future.add_done_callback(lambda done: _stored(recipe, done))
+
+
+def release_image(name):
+    """Drop a recipe's reference to an image and its renditions"""
+    image_storage.release(
+        name,
+        [rendition_name(name, rendition) for rendition in RENDITIONS]
+    )
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+                                           SearchVector
+from django.db import connection
+from django.db.models import BigIntegerField, F, OuterRef, Q, Subquery, \
+                             Value
+from django.db.models.functions import Cast, Coalesce, Round
+
+from core import models
+
+
+SEARCH_CONFIG = getattr(settings, 'RECIPE_SEARCH_CONFIG', 'english')
+RANK_SCALE = 10.0 ** 6
+
+
+def _linked_names(recipe_model, field, name_path):
+    """Return the space separated names linked to a recipe via field"""
+    links = getattr(recipe_model, field).through.objects.filter(
+        recipe_id=OuterRef('pk')
+    ).order_by().values('recipe_id').annotate(
+        names=StringAgg(name_path, ' ')
+    ).values('names')
+
+    return Coalesce(Subquery(links), Value(''))
+
+
+def search_vector(recipe_model=models.Recipe):
+    """Return the expression computing a recipe's stored search vector"""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(
+            _linked_names(recipe_model, 'tags', 'tag__name'),
+            weight='B',
+            config=SEARCH_CONFIG
+        ) +
+        SearchVector(
+            _linked_names(recipe_model, 'ingredients', 'ingredient__name'),
+            weight='C',
+            config=SEARCH_CONFIG
+        )
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute the stored search vector of every recipe in queryset"""
+    if connection.vendor != 'postgresql':
+        return
+
+    queryset.update(search_vector=search_vector(queryset.model))
+
+
+def _name_match(text):
+    """Return the filter matching text in recipe, tag or ingredient names"""
+    tag_match = models.Recipe.tags.through.objects.filter(
+        tag__name__icontains=text
+    ).values('recipe_id')
+    ingredient_match = models.Recipe.ingredients.through.objects.filter(
+        ingredient__name__icontains=text
+    ).values('recipe_id')
+
+    return (
+        Q(title__icontains=text) |
+        Q(id__in=tag_match) |
+        Q(id__in=ingredient_match)
+    )
+
+
+def search_recipes(queryset, text):
+    """Filter recipes matching text, ranked when the vector is available
+
+    Recipes without a stored vector, such as rows written by update(),
+    are matched by name and ranked last. The rank is scaled to an
+    integer so cursor pages compare it exactly.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.filter(_name_match(text))
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    rank = Coalesce(SearchRank(F('search_vector'), query), Value(0.0))
+    return queryset.filter(
+        Q(search_vector=query) |
+        Q(search_vector__isnull=True) & _name_match(text)
+    ).annotate(
+        search_rank=Cast(
+            Round(rank * Value(RANK_SCALE)),
+            BigIntegerField()
+        )
+    )
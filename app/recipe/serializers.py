@@ -1,9 +1,91 @@
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
 from rest_framework import serializers
 
 from core import models
 
 
-class TagSerializer(serializers.ModelSerializer):
+class UserOwnedPrimaryKeysField(serializers.ManyRelatedField):
+    """Many related field resolving all submitted IDs with one query
+
+    Only objects owned by the requesting user are accepted, and every
+    missing or foreign ID is reported at once. The validated value is
+    the list of fetched instances, which is used as is when saving.
+    """
+
+    def __init__(self, model, **kwargs):
+        self.model = model
+        super().__init__(
+            child_relation=serializers.PrimaryKeyRelatedField(
+                queryset=model.objects.all()
+            ),
+            **kwargs
+        )
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child_errors = self.child_relation.error_messages
+        pks = []
+        errors = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(int(item))
+            except (TypeError, ValueError):
+                errors.append(child_errors['incorrect_type'].format(
+                    data_type=type(item).__name__
+                ))
+        pks = list(dict.fromkeys(pks))
+
+        objects = self.model.objects.filter(
+            user=self.context['request'].user,
+            id__in=pks
+        ).in_bulk()
+        errors += [
+            child_errors['does_not_exist'].format(pk_value=pk)
+            for pk in pks if pk not in objects
+        ]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return [objects[pk] for pk in pks]
+
+
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for user owned recipe attributes"""
+
+    def name_taken(self):
+        """Return the error for a name the user already has"""
+        return f'{self.Meta.model.__name__} with this name already exists'
+
+    def validate_name(self, value):
+        """Reject names the requesting user already has"""
+        request = self.context.get('request')
+        exists = self.Meta.model.objects.filter(
+            user=request.user,
+            name=value
+        ).exists()
+        if exists:
+            raise serializers.ValidationError(self.name_taken())
+
+        return value
+
+    def create(self, validated_data):
+        """Create the object, rejecting a name taken since validation"""
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({'name': [self.name_taken()]})
+
+
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tag objects"""
 
     class Meta:
@@ -12,7 +94,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for Ingredient objects"""
 
     class Meta:
@@ -21,36 +103,197 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class RecipeAttrBatchSerializer(serializers.Serializer):
+    """Serializer for a batch of tag or ingredient names"""
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=1000
+    )
+
+
+class TagCountSerializer(TagSerializer):
+    """Serializer for tag objects with their recipe usage count"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count',)
+
+
+class IngredientCountSerializer(IngredientSerializer):
+    """Serializer for Ingredient objects with their recipe usage count"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ('recipe_count',)
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for Recipe objects"""
-    ingredients = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=models.Ingredient.objects.all()
+    ingredients = UserOwnedPrimaryKeysField(models.Ingredient)
+    tags = UserOwnedPrimaryKeysField(models.Tag)
+    ingredients_add = UserOwnedPrimaryKeysField(
+        models.Ingredient,
+        write_only=True,
+        required=False
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=models.Tag.objects.all()
+    ingredients_remove = UserOwnedPrimaryKeysField(
+        models.Ingredient,
+        write_only=True,
+        required=False
     )
+    tags_add = UserOwnedPrimaryKeysField(
+        models.Tag,
+        write_only=True,
+        required=False
+    )
+    tags_remove = UserOwnedPrimaryKeysField(
+        models.Tag,
+        write_only=True,
+        required=False
+    )
+
+    read_fields = (
+        'id', 'title', 'time_minutes', 'ingredients',
+        'tags', 'price', 'link'
+    )
+    delta_fields = {
+        'ingredients_add': ('ingredients', 'add'),
+        'ingredients_remove': ('ingredients', 'remove'),
+        'tags_add': ('tags', 'add'),
+        'tags_remove': ('tags', 'remove'),
+    }
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
 
     class Meta:
         model = models.Recipe
         fields = (
             'id', 'title', 'time_minutes', 'ingredients',
-            'tags', 'price', 'link'
+            'tags', 'price', 'link', 'ingredients_add',
+            'ingredients_remove', 'tags_add', 'tags_remove'
         )
         read_only_fields = ('id',)
 
+    def __init__(self, *args, **kwargs):
+        """Apply the fields and expand options given in the context"""
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+        for name in self.context.get('expand', ()):
+            if name in self.fields:
+                self.fields[name] = self.expandable_fields[name](
+                    many=True,
+                    read_only=True
+                )
+
+    def validate(self, attrs):
+        """Reject delta updates that conflict with each other"""
+        for field in self.expandable_fields:
+            added = attrs.get(f'{field}_add', [])
+            removed = attrs.get(f'{field}_remove', [])
+            if (added or removed) and field in attrs:
+                raise serializers.ValidationError({
+                    field: f'Cannot be combined with {field}_add or '
+                           f'{field}_remove'
+                })
+            if set(added) & set(removed):
+                raise serializers.ValidationError({
+                    f'{field}_remove': 'Cannot remove an object being added'
+                })
+
+        return attrs
+
+    def _pop_deltas(self, validated_data):
+        """Remove the delta operations from validated_data"""
+        return {
+            name: validated_data.pop(name)
+            for name in self.delta_fields if name in validated_data
+        }
+
+    def _apply_deltas(self, instance, deltas):
+        """Insert or delete only the through rows named by the deltas"""
+        for name, objects in deltas.items():
+            if objects:
+                field, operation = self.delta_fields[name]
+                getattr(getattr(instance, field), operation)(*objects)
+
+    def create(self, validated_data):
+        deltas = self._pop_deltas(validated_data)
+        instance = super().create(validated_data)
+        self._apply_deltas(instance, deltas)
+        return instance
+
+    def update(self, instance, validated_data):
+        deltas = self._pop_deltas(validated_data)
+        instance = super().update(instance, validated_data)
+        self._apply_deltas(instance, deltas)
+        return instance
+
+
+class RecipeBulkItemSerializer(RecipeSerializer):
+    """Serializer for one recipe of a bulk create
+
+    Related IDs are only checked for type here; they are resolved for the
+    whole batch at once when saving.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    ingredients_add = None
+    ingredients_remove = None
+    tags_add = None
+    tags_remove = None
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.read_fields
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """URLs of the ready renditions of a recipe image"""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = 'image_renditions'
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for rendition, name in (value or {}).items():
+            url = default_storage.url(name)
+            urls[rendition] = request.build_absolute_uri(url) \
+                if request else url
+
+        return urls
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    renditions = RenditionsField()
+
+    read_fields = RecipeSerializer.read_fields + ('renditions',)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('renditions',)
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    renditions = RenditionsField()
 
     class Meta:
         model = models.Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'renditions')
         read_only_fields = ('id',)
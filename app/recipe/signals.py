@@ -0,0 +1,115 @@
+from django.db.models.signals import m2m_changed, post_delete, \
+                                     post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core import models
+
+from recipe.cache import bump_version
+from recipe.renditions import release_image
+from recipe.search import update_search_vectors
+
+
+@receiver(post_save, sender=models.Tag)
+@receiver(post_save, sender=models.Ingredient)
+@receiver(post_save, sender=models.Recipe)
+@receiver(post_delete, sender=models.Tag)
+@receiver(post_delete, sender=models.Ingredient)
+@receiver(post_delete, sender=models.Recipe)
+def recipe_data_changed(sender, instance, **kwargs):
+    """Bump the owner's data version when a recipe object changes"""
+    bump_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=models.Recipe.tags.through)
+@receiver(m2m_changed, sender=models.Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, **kwargs):
+    """Bump the owner's data version when recipe links change"""
+    if action.startswith('post_'):
+        bump_version(instance.user_id)
+
+
+@receiver(post_save, sender=models.Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    """Refresh the search vector of a saved recipe"""
+    update_search_vectors(models.Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=models.Recipe.tags.through)
+@receiver(m2m_changed, sender=models.Recipe.ingredients.through)
+def recipe_links_changed_search(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Refresh the search vectors of recipes whose links changed"""
+    if not reverse:
+        if action.startswith('post_'):
+            update_search_vectors(
+                models.Recipe.objects.filter(pk=instance.pk)
+            )
+    elif action == 'pre_clear':
+        instance._search_recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        update_search_vectors(models.Recipe.objects.filter(
+            pk__in=instance.__dict__.pop('_search_recipe_ids', [])
+        ))
+    elif action in ('post_add', 'post_remove'):
+        update_search_vectors(models.Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=models.Tag)
+@receiver(post_save, sender=models.Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    """Refresh the search vectors of recipes using a renamed object"""
+    if not created:
+        update_search_vectors(instance.recipe_set.all())
+
+
+@receiver(pre_delete, sender=models.Tag)
+@receiver(pre_delete, sender=models.Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    """Remember the recipes using an object about to be deleted"""
+    instance._search_recipe_ids = list(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=models.Tag)
+@receiver(post_delete, sender=models.Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    """Refresh the search vectors of recipes that used a deleted object"""
+    update_search_vectors(models.Recipe.objects.filter(
+        pk__in=instance.__dict__.pop('_search_recipe_ids', [])
+    ))
+
+
+@receiver(pre_save, sender=models.Recipe)
+def recipe_image_saving(sender, instance, raw, update_fields, **kwargs):
+    """Remember the image of a recipe about to be saved"""
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and 'image' not in update_fields:
+        return
+
+    instance._stored_image = models.Recipe.objects.filter(
+        pk=instance.pk
+    ).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=models.Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    """Release the previous image of a recipe whose image was replaced
+
+    Storing the same content again also takes a reference, which is
+    released so a recipe holds one reference to its image.
+    """
+    previous = instance.__dict__.pop('_stored_image', None)
+    stored = instance.__dict__.pop('_image_stored', False)
+    if previous and (stored or previous != instance.image.name):
+        release_image(previous)
+
+
+@receiver(post_delete, sender=models.Recipe)
+def recipe_image_deleted(sender, instance, **kwargs):
+    """Release the image of a deleted recipe"""
+    if instance.image:
+        release_image(instance.image.name)
@@ -0,0 +1,233 @@
+import asyncio
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.test import AsyncClient, TransactionTestCase, override_settings
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import aiodb, models
+
+from user import tokens
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class AsyncReadViewTests(TransactionTestCase):
+    """Test the async recipe read views against the synchronous ones"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        tag = models.Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = models.Ingredient.objects.create(
+            user=self.user,
+            name='Salt'
+        )
+        self.recipe = models.Recipe.objects.create(
+            user=self.user,
+            title='Soup',
+            time_minutes=10,
+            price=5.50,
+            link='https://example.com/soup'
+        )
+        self.recipe.tags.add(tag)
+        self.recipe.ingredients.add(ingredient)
+        models.Recipe.objects.create(
+            user=self.user,
+            title='Bread',
+            time_minutes=60,
+            price=2.00
+        )
+
+    def async_request(self, method, path, data=None, **headers):
+        """Make a request through the ASGI handler and async URLs"""
+        headers.setdefault('authorization', f'Token {self.token.key}')
+        if method == 'get' and data:
+            # The async test client sends GET data as a header
+            path, data = f'{path}?{urlencode(data)}', None
+
+        async def request():
+            try:
+                return await getattr(AsyncClient(), method)(
+                    path,
+                    data,
+                    **headers
+                )
+            finally:
+                aiodb.close_pool()
+
+        with override_settings(ROOT_URLCONF='app.asgi_urls'):
+            return async_to_sync(request)()
+
+    def assertSameAsSync(self, path, data=None):
+        """Assert a GET returns what the synchronous view returns"""
+        sync_res = self.client.get(path, data)
+        cache.clear()
+        res = self.async_request('get', path, data)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), sync_res.json())
+        self.assertEqual(res['Content-Type'], sync_res['Content-Type'])
+
+    def test_recipe_list(self):
+        """Test listing recipes matches the synchronous view"""
+        self.assertSameAsSync(RECIPES_URL)
+
+    def test_recipe_list_fields_and_pages(self):
+        """Test fieldsets and pages match the synchronous view"""
+        self.assertSameAsSync(RECIPES_URL, {'fields': 'id,tags,price'})
+        self.assertSameAsSync(RECIPES_URL, {'page_size': 1})
+
+    def test_recipe_list_expand_falls_back(self):
+        """Test nested expansion is served by the synchronous view"""
+        self.assertSameAsSync(RECIPES_URL, {'expand': 'tags'})
+
+    def test_recipe_detail(self):
+        """Test a recipe detail matches the synchronous view"""
+        self.assertSameAsSync(detail_url(self.recipe.id))
+        self.assertSameAsSync(
+            detail_url(self.recipe.id),
+            {'fields': 'title,tags'}
+        )
+
+    def test_attr_lists(self):
+        """Test tag and ingredient lists match the synchronous views"""
+        self.assertSameAsSync(TAGS_URL)
+        self.assertSameAsSync(INGREDIENTS_URL, {'with_counts': 1})
+
+    def test_reads_run_no_synchronous_queries(self):
+        """Test the async views never use Django's own connection"""
+        with self.assertNumQueries(0):
+            res = self.async_request('get', RECIPES_URL)
+            self.async_request('get', detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()['results']), 2)
+
+    def test_cache_called_off_the_event_loop(self):
+        """Test the blocking cache client never runs on the event loop"""
+        calls = []
+
+        def recording(method):
+            def call(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    calls.append('loop')
+                except RuntimeError:
+                    calls.append('thread')
+                return method(*args, **kwargs)
+            return call
+
+        bearer = f'Bearer {tokens.issue_access_token(self.user)}'
+        with patch.object(cache, 'get', recording(cache.get)), \
+                patch.object(cache, 'set', recording(cache.set)), \
+                patch.object(cache, 'add', recording(cache.add)):
+            self.async_request('get', RECIPES_URL)
+            self.async_request('get', RECIPES_URL)
+            self.async_request('get', detail_url(self.recipe.id))
+            self.async_request('get', TAGS_URL, authorization=bearer)
+
+        self.assertIn('thread', calls)
+        self.assertNotIn('loop', calls)
+
+    def test_bearer_token(self):
+        """Test signed access tokens authenticate the async views"""
+        token = tokens.issue_access_token(self.user)
+        res = self.async_request(
+            'get',
+            RECIPES_URL,
+            authorization=f'Bearer {token}'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_authentication_required(self):
+        """Test missing and invalid credentials are rejected"""
+        res = self.async_request('get', RECIPES_URL, authorization='')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+        res = self.async_request(
+            'get',
+            RECIPES_URL,
+            authorization='Token invalid'
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res.json(), {'detail': 'Invalid token.'})
+
+    def test_inactive_user_rejected(self):
+        """Test tokens of inactive users are rejected"""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.async_request('get', TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_detail_not_found(self):
+        """Test other users' and missing recipes are not found"""
+        other = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'testpass'
+        )
+        recipe = models.Recipe.objects.create(
+            user=other,
+            title='Stew',
+            time_minutes=5,
+            price=1.00
+        )
+
+        for path in (detail_url(recipe.id), detail_url('abc')):
+            res = self.async_request('get', path)
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_not_modified(self):
+        """Test ETags match the synchronous views' and give 304s"""
+        etag = self.async_request('get', RECIPES_URL)['ETag']
+
+        res = self.async_request(
+            'get',
+            RECIPES_URL,
+            **{'if-none-match': etag}
+        )
+        sync_res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(sync_res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_fall_back(self):
+        """Test writes to the async routes reach the synchronous views"""
+        res = self.async_request(
+            'post',
+            TAGS_URL,
+            {'name': 'Dessert'},
+            content_type='application/json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            models.Tag.objects.filter(user=self.user, name='Dessert').exists()
+        )
@@ -0,0 +1,208 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import reverse
+from django.test import TestCase
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import models
+from core.tests.utils import capture_on_commit_callbacks
+
+from recipe.cache import data_version
+from recipe.tests.test_recipe_api import sample_recipe
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class ListCacheTests(TestCase):
+    """Test caching of the recipe API list endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@user.com',
+            password='testpassword',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not query the database"""
+        models.Tag.objects.create(user=self.user, name='Vegan')
+        res1 = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res2 = self.client.get(TAGS_URL)
+
+        self.assertEqual(res1.data, res2.data)
+
+    def test_query_params_cached_separately(self):
+        """Test different query parameters are cached under separate keys"""
+        models.Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        self.assertIn('recipe_count', res.data['results'][0])
+
+    def test_create_invalidates_cache(self):
+        """Test creating an object invalidates the cached list"""
+        self.client.get(TAGS_URL)
+
+        with capture_on_commit_callbacks(execute=True):
+            models.Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_version_bumped_on_commit(self):
+        """Test the data version only changes once the write commits"""
+        version = data_version(self.user.id)
+
+        with capture_on_commit_callbacks() as callbacks:
+            models.Tag.objects.create(user=self.user, name='Vegan')
+            self.client.get(TAGS_URL)
+
+        self.assertEqual(data_version(self.user.id), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(data_version(self.user.id), version)
+
+    def test_m2m_change_invalidates_cache(self):
+        """Test changing recipe tags invalidates the cached list"""
+        recipe = sample_recipe(user=self.user)
+        tag = models.Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPES_URL)
+
+        with capture_on_commit_callbacks(execute=True):
+            recipe.tags.add(tag)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+
+    def test_delete_invalidates_cache(self):
+        """Test deleting a recipe invalidates the cached list"""
+        recipe = sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        with capture_on_commit_callbacks(execute=True):
+            recipe.delete()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_cache_limited_to_user(self):
+        """Test cached lists are not shared between users"""
+        models.Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        user2 = get_user_model().objects.create_user(
+            email='other_test@user.com',
+            password='testpassword',
+            name='Test User'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling on the recipe API"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@user.com',
+            password='testpassword',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified(self):
+        """Test a matching If-None-Match returns 304 without queries"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_modified_after_change(self):
+        """Test a stale ETag gets the full updated response"""
+        res = self.client.get(TAGS_URL)
+        etag = res['ETag']
+
+        with capture_on_commit_callbacks(execute=True):
+            models.Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_detail_not_modified(self):
+        """Test conditional requests on recipe detail"""
+        recipe = sample_recipe(user=self.user)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        res = self.client.get(url)
+
+        later = time.time_ns() + 2 * 10 ** 9
+        with patch('recipe.cache.time.time_ns', return_value=later):
+            res = self.client.get(url)
+            not_modified = self.client.get(
+                url,
+                HTTP_IF_NONE_MATCH=res['ETag']
+            )
+            since = self.client.get(
+                url,
+                HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+            )
+
+        self.assertEqual(
+            not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEqual(since.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_no_last_modified_within_change_second(self):
+        """Test If-Modified-Since is ignored in the second of a change"""
+        with capture_on_commit_callbacks(execute=True):
+            recipe = sample_recipe(user=self.user)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        version = cache.get(f'recipe:version:{self.user.id}')
+
+        with patch('recipe.cache.time.time_ns', return_value=version + 1):
+            res = self.client.get(url)
+            since = self.client.get(
+                url,
+                HTTP_IF_MODIFIED_SINCE=http_date(version // 10 ** 9 + 60)
+            )
+
+        self.assertNotIn('Last-Modified', res)
+        self.assertEqual(since.status_code, status.HTTP_200_OK)
+
+    def test_etag_differs_per_object(self):
+        """Test each recipe detail has its own ETag"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+
+        res1 = self.client.get(
+            reverse('recipe:recipe-detail', args=[recipe1.id])
+        )
+        res2 = self.client.get(
+            reverse('recipe:recipe-detail', args=[recipe2.id])
+        )
+
+        self.assertNotEqual(res1['ETag'], res2['ETag'])
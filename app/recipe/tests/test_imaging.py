@@ -0,0 +1,116 @@
+import io
+import os
+import re
+import tempfile
+
+from PIL import Image
+
+from django.test import SimpleTestCase
+from unittest import skipUnless
+
+from recipe import imaging
+
+
+def memory_status(key):
+    """Return a memory figure of this process from /proc in bytes"""
+    with open('/proc/self/status') as status:
+        match = re.search(rf'{key}:\s+(\d+) kB', status.read())
+
+    return int(match.group(1)) * 1024
+
+
+def peak_memory(func):
+    """Return how far func raises the peak resident memory in bytes"""
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    before = memory_status('VmRSS')
+    func()
+
+    return memory_status('VmHWM') - before
+
+
+def can_reset_peak_memory():
+    """Return whether the peak resident memory can be reset"""
+    return os.access('/proc/self/clear_refs', os.W_OK)
+
+
+class FitImageTests(SimpleTestCase):
+    """Test checking and downscaling images on ingest"""
+
+    def setUp(self):
+        self.source = tempfile.NamedTemporaryFile(suffix='.jpg')
+        Image.new('RGB', (4000, 4000), (200, 10, 10)).save(
+            self.source,
+            format='JPEG'
+        )
+        self.source.flush()
+
+    def tearDown(self):
+        self.source.close()
+
+    def test_fit_image_within_dimension(self):
+        """Test images within the dimension limit are kept as they are"""
+        output = io.BytesIO()
+
+        fitted = imaging.fit_image(
+            self.source.name,
+            output,
+            50 * 1000 * 1000,
+            4000,
+            1024
+        )
+
+        self.assertFalse(fitted)
+        self.assertEqual(output.getvalue(), b'')
+
+    def test_fit_image_over_pixels(self):
+        """Test images over the pixel limit are rejected"""
+        with self.assertRaises(imaging.ImageRejected):
+            imaging.fit_image(
+                self.source.name,
+                io.BytesIO(),
+                4000 * 4000 - 1,
+                1000,
+                1024 * 1024 * 1024
+            )
+
+    def test_fit_image_read_only_format(self):
+        """Test downscaling a format Pillow cannot write is rejected"""
+        xpm = (
+            b'/* XPM */\n'
+            b'static char *image[] = {\n'
+            b'"4 2 2 1",\n'
+            b'"  c #000000",\n'
+            b'". c #FFFFFF",\n'
+            b'" .. ",\n'
+            b'".  .",\n'
+            b'};\n'
+        )
+
+        with self.assertRaises(imaging.ImageRejected):
+            imaging.fit_image(
+                io.BytesIO(xpm),
+                io.BytesIO(),
+                50 * 1000 * 1000,
+                2,
+                1024 * 1024
+            )
+
+    @skipUnless(can_reset_peak_memory(), 'peak memory cannot be reset')
+    def test_fit_image_peak_memory(self):
+        """Test downscaling stays within the memory limit"""
+        memory_limit = 16 * 1024 * 1024
+        output = io.BytesIO()
+
+        peak = peak_memory(lambda: imaging.fit_image(
+            self.source.name,
+            output,
+            50 * 1000 * 1000,
+            1000,
+            memory_limit
+        ))
+
+        self.assertLess(peak, memory_limit)
+        output.seek(0)
+        with Image.open(output) as image:
+            self.assertEqual(image.size, (1000, 1000))
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.shortcuts import reverse
 from django.test import TestCase
 
@@ -11,6 +12,7 @@ from recipe import serializers
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
+BATCH_URL = reverse('recipe:ingredient-batch')
 
 
 class PublicIngredientsApiTests(TestCase):
@@ -30,6 +32,7 @@ class PrivateIngredientsApiTests(TestCase):
     """Test the authorized user Ingredients API"""
 
     def setUp(self):
+        cache.clear()
         self.user = get_user_model().objects.create_user(
             email='test@user.com',
             password='testpassword',
@@ -55,7 +58,7 @@ class PrivateIngredientsApiTests(TestCase):
         serializer = serializers.IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients are returned only for given user"""
@@ -76,8 +79,8 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         """Test creating a new ingredient"""
@@ -123,8 +126,8 @@ class PrivateIngredientsApiTests(TestCase):
 
         serializer1 = serializers.IngredientSerializer(ingredient1)
         serializer2 = serializers.IngredientSerializer(ingredient2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_ingredients_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique value"""
@@ -154,4 +157,71 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_ingredients_with_counts(self):
+        """Test ingredients are returned with their recipe usage counts"""
+        used = models.Ingredient.objects.create(user=self.user, name='Eggs')
+        models.Ingredient.objects.create(user=self.user, name='Chicken')
+        for title in ('Coriander eggs on toast', 'Avocado on toast'):
+            recipe = models.Recipe.objects.create(
+                title=title,
+                time_minutes=15,
+                price=55.00,
+                user=self.user
+            )
+            recipe.ingredients.add(used)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(INGREDIENTS_URL, {'with_counts': 1})
+
+        counts = {
+            item['name']: item['recipe_count']
+            for item in res.data['results']
+        }
+        self.assertEqual(counts, {'Eggs': 2, 'Chicken': 0})
+
+    def test_batch_get_or_create_ingredients(self):
+        """Test resolving ingredient names, creating missing ones"""
+        milk = models.Ingredient.objects.create(user=self.user, name='Milk')
+        user2 = get_user_model().objects.create_user(
+            email='other_test@user.com',
+            password='testpassword'
+        )
+        models.Ingredient.objects.create(user=user2, name='Flour')
+        payload = {'names': ['Flour', 'Milk', 'Egg', 'Flour']}
+
+        with self.assertNumQueries(3):
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [i['name'] for i in res.data],
+            ['Flour', 'Milk', 'Egg']
+        )
+        self.assertEqual(res.data[1]['id'], milk.id)
+        owned = models.Ingredient.objects.filter(user=self.user)
+        self.assertEqual(
+            {i['id'] for i in res.data},
+            set(owned.values_list('id', flat=True))
+        )
+
+    def test_batch_existing_ingredients_single_query(self):
+        """Test resolving only existing names runs a single query"""
+        models.Ingredient.objects.create(user=self.user, name='Milk')
+
+        with self.assertNumQueries(1):
+            res = self.client.post(
+                BATCH_URL,
+                {'names': ['Milk']},
+                format='json'
+            )
+
         self.assertEqual(len(res.data), 1)
+
+    def test_batch_invalid_names(self):
+        """Test the batch payload is validated"""
+        for payload in ({'names': []}, {'names': ['']}, {}):
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,21 +1,35 @@
+import csv
+import io
+import json
 import tempfile
 import os
+import struct
+import zlib
+
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.shortcuts import reverse
-from django.test import TestCase
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core import models
+from core.tests.utils import capture_on_commit_callbacks
 
-from recipe import serializers
+from recipe import filters, imaging, serializers
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk-create')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def image_upload_url(recipe_id):
@@ -23,6 +37,19 @@ def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def png_header(width, height):
+    """Return a PNG declaring the size but holding almost no pixel data"""
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + \
+            struct.pack('>I', zlib.crc32(body))
+
+    header = struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + \
+        chunk(b'IDAT', zlib.compress(b'')) + \
+        chunk(b'IEND', b'')
+
+
 def detail_url(recipe_id):
     """Return recipe detail url"""
     return reverse('recipe:recipe-detail', args=[recipe_id])
@@ -67,6 +94,7 @@ class PrivateRecipeApiTests(TestCase):
     """Test the authorized user recipes API"""
 
     def setUp(self):
+        cache.clear()
         self.user = get_user_model().objects.create_user(
             email='test@user.com',
             password='testpassword',
@@ -86,7 +114,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = serializers.RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test that recipes are returned only for given user"""
@@ -104,8 +132,8 @@ class PrivateRecipeApiTests(TestCase):
         serializer = serializers.RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -119,6 +147,366 @@ class PrivateRecipeApiTests(TestCase):
         serializer = serializers.RecipeDetailSerializer(recipe)
         self.assertEqual(res.data, serializer.data)
 
+    def test_recipes_paginated_by_cursor(self):
+        """Test recipes are paginated with opaque cursors"""
+        recipes = [
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipes[4].id, recipes[3].id]
+        )
+        self.assertIsNone(res.data['previous'])
+        self.assertIn('cursor=', res.data['next'])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipes[2].id, recipes[1].id]
+        )
+        self.assertIsNotNone(res.data['previous'])
+
+    def test_filter_recipes_by_tags_unique(self):
+        """Test recipes matching several tags are returned once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_by_all_tags(self):
+        """Test returning recipes having every given tag"""
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        recipe1 = sample_recipe(user=self.user, title='Vegan brownie')
+        recipe1.tags.add(tag1, tag2)
+        recipe2 = sample_recipe(user=self.user, title='Lentil soup')
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'tags_mode': 'all'}
+        )
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipe1.id]
+        )
+
+    def test_filter_recipes_by_all_ingredients(self):
+        """Test returning recipes having every given ingredient"""
+        ingredient1 = sample_ingredient(user=self.user, name='Egg')
+        ingredient2 = sample_ingredient(user=self.user, name='Flour')
+        recipe1 = sample_recipe(user=self.user, title='Pasta')
+        recipe1.ingredients.add(ingredient1, ingredient2)
+        recipe2 = sample_recipe(user=self.user, title='Omelette')
+        recipe2.ingredients.add(ingredient1)
+
+        res = self.client.get(RECIPES_URL, {
+            'ingredients': f'{ingredient1.id},{ingredient2.id}',
+            'ingredients_mode': 'all'
+        })
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipe1.id]
+        )
+
+    def test_filter_recipes_invalid_params(self):
+        """Test invalid filter parameters are rejected"""
+        too_many = ','.join(str(i) for i in range(filters.MAX_FILTER_IDS + 1))
+        invalid = (
+            {'tags': 'abc'},
+            {'tags': too_many},
+            {'tags': '1', 'tags_mode': 'some'},
+        )
+
+        for params in invalid:
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        """Test searching recipes by title, tag and ingredient names"""
+        recipe1 = sample_recipe(user=self.user, title='Thai green curry')
+        recipe2 = sample_recipe(user=self.user, title='Pancakes')
+        recipe2.tags.add(sample_tag(user=self.user, name='Curries'))
+        recipe3 = sample_recipe(user=self.user, title='Fish and chips')
+        recipe3.ingredients.add(sample_ingredient(user=self.user, name='Cod'))
+        sample_recipe(user=self.user, title='Ice cream')
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry'})
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(sorted(ids), sorted([recipe1.id, recipe2.id]))
+
+        res = self.client.get(RECIPES_URL, {'search': 'cod'})
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [recipe3.id])
+
+    def test_search_recipes_ranked(self):
+        """Test title matches rank above ingredient matches"""
+        recipe1 = sample_recipe(user=self.user, title='Lemon tart')
+        recipe1.ingredients.add(sample_ingredient(user=self.user, name='Egg'))
+        recipe2 = sample_recipe(user=self.user, title='Egg fried rice')
+
+        res = self.client.get(RECIPES_URL, {'search': 'egg'})
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipe2.id, recipe1.id]
+        )
+
+    def test_search_recipes_with_filters(self):
+        """Test search combines with tag filtering"""
+        tag = sample_tag(user=self.user, name='Vegan')
+        recipe1 = sample_recipe(user=self.user, title='Vegetable curry')
+        recipe1.tags.add(tag)
+        sample_recipe(user=self.user, title='Chicken curry')
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry', 'tags': tag.id})
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipe1.id]
+        )
+
+    def test_search_follows_renamed_tag(self):
+        """Test renaming a tag updates the recipes found by search"""
+        tag = sample_tag(user=self.user, name='Spicy')
+        recipe = sample_recipe(user=self.user, title='Noodles')
+        recipe.tags.add(tag)
+
+        tag.name = 'Smoky'
+        tag.save()
+        res = self.client.get(RECIPES_URL, {'search': 'smoky'})
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipe.id]
+        )
+
+    def test_search_recipes_paginated(self):
+        """Test ranked search results can be paged through"""
+        for i in range(3):
+            sample_recipe(user=self.user, title=f'Curry {i}')
+        sample_recipe(user=self.user, title='Curry curry')
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry', 'page_size': 2})
+        ids = [r['id'] for r in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [r['id'] for r in res.data['results']]
+
+        self.assertEqual(len(set(ids)), 4)
+        self.assertIsNone(res.data['next'])
+
+    def test_search_recipes_paged_by_rank(self):
+        """Test paging through distinct and tied ranks is exact"""
+        tag = sample_tag(user=self.user, name='Curry')
+        ingredient = sample_ingredient(user=self.user, name='Curry paste')
+        for i in range(4):
+            sample_recipe(user=self.user, title=f'Curry {i}')
+            sample_recipe(user=self.user, title='Rice').tags.add(tag)
+            sample_recipe(user=self.user, title='Soup').ingredients.add(
+                ingredient
+            )
+        sample_recipe(user=self.user, title='Curry curry')
+        models.Recipe.objects.filter(title='Curry 3').update(
+            search_vector=None
+        )
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry'})
+        expected = [r['id'] for r in res.data['results']]
+        ids = []
+        res = self.client.get(RECIPES_URL, {'search': 'curry', 'page_size': 3})
+        for _ in range(len(expected)):
+            ids += [r['id'] for r in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(expected), 13)
+        self.assertEqual(ids, expected)
+        self.assertEqual(
+            models.Recipe.objects.get(id=expected[0]).title,
+            'Curry curry'
+        )
+        self.assertEqual(
+            models.Recipe.objects.get(id=expected[-1]).title,
+            'Curry 3'
+        )
+
+    def test_search_recipes_without_vector(self):
+        """Test recipes without a stored vector are matched by name"""
+        recipe = sample_recipe(user=self.user, title='Pancakes')
+        recipe.tags.add(sample_tag(user=self.user, name='Breakfast'))
+        sample_recipe(user=self.user, title='Ice cream')
+        models.Recipe.objects.update(search_vector=None)
+
+        res = self.client.get(RECIPES_URL, {'search': 'breakfast'})
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipe.id]
+        )
+
+    def test_list_sparse_fieldset(self):
+        """Test ?fields= limits the serialized fields and loaded columns"""
+        recipe = sample_recipe(user=self.user, link='https://example.com')
+        recipe.tags.add(sample_tag(user=self.user))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title,price'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(res.data['results'][0]),
+            {'id', 'title', 'price'}
+        )
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('"link"', ctx.captured_queries[0]['sql'])
+
+    def test_list_expand_relations(self):
+        """Test ?expand= embeds tags and ingredients in list results"""
+        recipe = self._add_tagged_recipe('Recipe 0')
+        baseline = self._count_queries(RECIPES_URL + '?expand=tags')
+        self._add_tagged_recipe('Recipe 1')
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {'expand': 'tags'})
+
+        self.assertEqual(len(ctx.captured_queries), baseline)
+        result = res.data['results'][-1]
+        tag = recipe.tags.get()
+        self.assertEqual(result['tags'], [{'id': tag.id, 'name': tag.name}])
+        self.assertEqual(result['ingredients'], [
+            ingredient.id for ingredient in recipe.ingredients.all()
+        ])
+
+    def test_list_unknown_fields(self):
+        """Test unknown names in ?fields= and ?expand= are rejected"""
+        for params in ({'fields': 'id,secret'}, {'expand': 'title'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_sparse_fieldset(self):
+        """Test ?fields= applies to recipe detail"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.get(detail_url(recipe.id), {'fields': 'id,tags'})
+
+        self.assertEqual(set(res.data), {'id', 'tags'})
+        self.assertEqual(res.data['tags'][0]['name'], 'Main course')
+
+    def test_detail_sparse_fieldset_renditions(self):
+        """Test ?fields= accepts the renditions of recipe detail"""
+        recipe = sample_recipe(user=self.user)
+        recipe.image_renditions = {'thumbnail': 'uploads/recipe/t.webp'}
+        recipe.save()
+
+        res = self.client.get(
+            detail_url(recipe.id),
+            {'fields': 'id,renditions'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data), {'id', 'renditions'})
+        self.assertTrue(
+            res.data['renditions']['thumbnail'].endswith(
+                'uploads/recipe/t.webp'
+            )
+        )
+
+    def test_list_renditions_field_rejected(self):
+        """Test renditions are only offered by recipe detail"""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,renditions'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fast_list_parity(self):
+        """Test the fast list path renders the same bytes as serializers"""
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(3)]
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            for i in range(3)
+        ]
+        for i in range(4):
+            recipe = sample_recipe(
+                user=self.user,
+                title=f'Recipe {i}',
+                price=f'{i}.5',
+                link=f'https://example.com/{i}'
+            )
+            recipe.tags.add(*reversed(tags[:i]))
+            recipe.ingredients.add(*ingredients[i:])
+        queries = (
+            {},
+            {'fields': 'title,tags,price'},
+            {'search': 'recipe', 'page_size': 2},
+        )
+
+        for params in queries:
+            cache.clear()
+            fast = self.client.get(RECIPES_URL, params)
+            cache.clear()
+            with self.settings(RECIPE_API_FAST_LIST=False):
+                slow = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, slow.content)
+
+    def _count_queries(self, url):
+        """Return the number of queries run while fetching url"""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def _add_tagged_recipe(self, title):
+        """Create a recipe with its own tag and ingredient"""
+        with capture_on_commit_callbacks(execute=True):
+            recipe = sample_recipe(user=self.user, title=title)
+            recipe.tags.add(sample_tag(user=self.user, name=f'{title} tag'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'{title} ingredient')
+            )
+        return recipe
+
+    def test_list_query_count_constant(self):
+        """Test listing recipes does not run a query per recipe"""
+        self._add_tagged_recipe('Recipe 0')
+        baseline = self._count_queries(RECIPES_URL)
+
+        for i in range(1, 6):
+            self._add_tagged_recipe(f'Recipe {i}')
+
+        self.assertEqual(self._count_queries(RECIPES_URL), baseline)
+
+    def test_detail_query_count_constant(self):
+        """Test recipe detail does not run a query per tag or ingredient"""
+        recipe = self._add_tagged_recipe('Recipe')
+        url = detail_url(recipe.id)
+        baseline = self._count_queries(url)
+
+        for i in range(5):
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+
+        self.assertEqual(self._count_queries(url), baseline)
+
     def test_create_basic_recipe(self):
         """Test creating a new recipe"""
         payload = {
@@ -171,6 +559,49 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_tags_single_query(self):
+        """Test related IDs are validated with one query per relation"""
+        def create(tag_count):
+            tags = [
+                sample_tag(user=self.user, name=f'Tag {tag_count} {i}')
+                for i in range(tag_count)
+            ]
+            payload = {
+                'title': 'Curry',
+                'time_minutes': 25,
+                'price': '5.00',
+                'tags': [tag.id for tag in tags],
+                'ingredients': []
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(create(2), create(20))
+
+    def test_create_recipe_foreign_tags(self):
+        """Test another user's and unknown IDs are all rejected at once"""
+        user2 = get_user_model().objects.create_user(
+            email='other_test@user.com',
+            password='testpassword'
+        )
+        own_tag = sample_tag(user=self.user)
+        other_tag = sample_tag(user=user2)
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 25,
+            'price': '5.00',
+            'tags': [own_tag.id, other_tag.id, 0],
+            'ingredients': []
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertFalse(models.Recipe.objects.exists())
+
     def test_partial_update_recipe(self):
         """Test updating a recipe with patch"""
         recipe = sample_recipe(user=self.user)
@@ -190,6 +621,61 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(tags), 1)
         self.assertIn(new_tag, tags)
 
+    def test_partial_update_tag_deltas(self):
+        """Test adding and removing tags without sending the full set"""
+        recipe = sample_recipe(user=self.user)
+        kept = sample_tag(user=self.user, name='Kept')
+        removed = sample_tag(user=self.user, name='Removed')
+        added = sample_tag(user=self.user, name='Added')
+        recipe.tags.add(kept, removed)
+
+        res = self.client.patch(detail_url(recipe.id), {
+            'tags_add': [added.id],
+            'tags_remove': [removed.id]
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(recipe.tags.all()), {kept, added})
+        self.assertNotIn('tags_add', res.data)
+
+    def test_partial_update_delta_independent_of_set_size(self):
+        """Test the queries run for a delta do not grow with the set"""
+        def add_one(existing):
+            recipe = sample_recipe(user=self.user)
+            recipe.tags.add(*[
+                sample_tag(user=self.user, name=f'Tag {existing} {i}')
+                for i in range(existing)
+            ])
+            tag = sample_tag(user=self.user, name=f'New {existing}')
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.patch(
+                    detail_url(recipe.id),
+                    {'ingredients_add': [], 'tags_add': [tag.id]},
+                    format='json'
+                )
+            self.assertIn(tag, recipe.tags.all())
+            return len(ctx.captured_queries)
+
+        self.assertEqual(add_one(2), add_one(20))
+
+    def test_partial_update_conflicting_deltas(self):
+        """Test conflicting delta operations are rejected"""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user)
+        invalid = (
+            {'tags': [tag.id], 'tags_add': [tag.id]},
+            {'tags_add': [tag.id], 'tags_remove': [tag.id]},
+        )
+
+        for payload in invalid:
+            res = self.client.patch(
+                detail_url(recipe.id),
+                payload,
+                format='json'
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_full_update_recipe(self):
         """Test updating a recipe with put"""
         recipe = sample_recipe(user=self.user)
@@ -211,10 +697,225 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(tags), 0)
 
 
+class RecipeBulkApiTests(TestCase):
+    """Test creating recipes in bulk"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@user.com',
+            password='testpassword',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _payload(self, count, **params):
+        """Return a list of count recipe payloads"""
+        return [
+            dict({'title': f'Recipe {i}', 'time_minutes': 5, 'price': '5.00'},
+                 **params)
+            for i in range(count)
+        ]
+
+    def test_bulk_create_recipes(self):
+        """Test bulk creating recipes takes a constant number of queries"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        payload = self._payload(
+            3,
+            tags=[tag.id],
+            ingredients=[ingredient.id]
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(BULK_URL, payload, format='json')
+        few_queries = len(ctx.captured_queries)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(BULK_URL, self._payload(
+                30,
+                tags=[tag.id],
+                ingredients=[ingredient.id]
+            ), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(ctx.captured_queries), few_queries)
+        self.assertEqual(res.data['errors'], [])
+        recipe = models.Recipe.objects.get(id=res.data['created'][2]['id'])
+        self.assertEqual(recipe.title, 'Recipe 2')
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_bulk_create_without_returned_ids(self):
+        """Test bulk creating on backends that return no inserted IDs"""
+        tag = sample_tag(user=self.user)
+        sample_recipe(user=self.user, title='Existing')
+
+        with patch.object(
+            connection.features,
+            'can_return_rows_from_bulk_insert',
+            False
+        ):
+            res = self.client.post(
+                BULK_URL,
+                self._payload(3, tags=[tag.id]),
+                format='json'
+            )
+        created = [item['id'] for item in res.data['created']]
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [models.Recipe.objects.get(id=pk).title for pk in created],
+            ['Recipe 0', 'Recipe 1', 'Recipe 2']
+        )
+        self.assertEqual(
+            models.Recipe.objects.filter(id__in=created, tags=tag).count(),
+            3
+        )
+        # The sequence moved past the bulk inserted IDs
+        self.assertGreater(sample_recipe(user=self.user).id, max(created))
+
+    def test_bulk_create_partial(self):
+        """Test invalid items are reported while valid ones are created"""
+        user2 = get_user_model().objects.create_user(
+            email='other_test@user.com',
+            password='testpassword'
+        )
+        other_tag = sample_tag(user=user2)
+        payload = self._payload(3)
+        payload[0]['title'] = ''
+        payload[2]['tags'] = [other_tag.id]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['index'] for item in res.data['created']],
+            [1]
+        )
+        errors = [
+            (item['index'], set(item['errors']))
+            for item in res.data['errors']
+        ]
+        self.assertEqual(errors, [(0, {'title'}), (2, {'tags'})])
+        self.assertEqual(models.Recipe.objects.count(), 1)
+
+    def test_bulk_create_atomic(self):
+        """Test nothing is created in atomic mode if any item is invalid"""
+        payload = self._payload(3)
+        payload[1]['time_minutes'] = 'soon'
+
+        res = self.client.post(BULK_URL + '?atomic=1', payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertFalse(models.Recipe.objects.exists())
+
+    def test_bulk_create_searchable_and_listed(self):
+        """Test bulk created recipes show up in lists and search"""
+        self.client.get(RECIPES_URL)
+
+        self.client.post(BULK_URL, self._payload(2), format='json')
+        res = self.client.get(RECIPES_URL, {'search': 'recipe'})
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_bulk_create_invalid_payload(self):
+        """Test the bulk payload must be a list"""
+        res = self.client.post(BULK_URL, {'title': 'x'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_API_BULK_MAX_ITEMS=2)
+    def test_bulk_create_too_many(self):
+        """Test bulk creates over the configured limit are rejected"""
+        res = self.client.post(BULK_URL, self._payload(3), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.Recipe.objects.exists())
+
+
+class RecipeExportApiTests(TestCase):
+    """Test streaming exports of a user's recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@user.com',
+            password='testpassword',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user, title='Curry, hot')
+        self.recipe.tags.add(
+            sample_tag(user=self.user, name='Vegan'),
+            sample_tag(user=self.user, name='Dinner')
+        )
+        self.recipe.ingredients.add(sample_ingredient(user=self.user))
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as newline delimited JSON"""
+        sample_recipe(user=self.user, title='Toast')
+        user2 = get_user_model().objects.create_user(
+            email='other_test@user.com',
+            password='testpassword'
+        )
+        sample_recipe(user=user2)
+
+        res = self.client.get(EXPORT_URL, {'format': 'ndjson'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row['title'] for row in rows],
+            ['Curry, hot', 'Toast']
+        )
+        self.assertEqual(rows[0]['tags'], ['Vegan', 'Dinner'])
+        self.assertEqual(rows[0]['ingredients'], ['Water'])
+        self.assertEqual(rows[0]['price'], '100.00')
+        self.assertEqual(rows[1]['tags'], [])
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry, hot')
+        self.assertEqual(rows[0]['tags'], 'Vegan|Dinner')
+
+    @patch('recipe.export.EXPORT_CHUNK_SIZE', 2)
+    def test_export_queries_per_chunk(self):
+        """Test names are fetched once per chunk, not once per recipe"""
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(EXPORT_URL)
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 6)
+        chunks = 3
+        self.assertLessEqual(len(ctx.captured_queries), 1 + chunks * 3)
+
+    def test_export_unknown_format(self):
+        """Test an unsupported export format is rejected"""
+        res = self.client.get(EXPORT_URL, {'format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(RECIPE_RENDITIONS_ASYNC=False)
 class RecipeImageUploadTests(TestCase):
     """API tests to manage Image Uploads"""
 
     def setUp(self):
+        cache.clear()
         self.user = get_user_model().objects.create_user(
             email='test@user.com',
             password='testpassword',
@@ -226,6 +927,9 @@ class RecipeImageUploadTests(TestCase):
 
     def tearDown(self):
         """Remove tempfiles after the tests are complete"""
+        self.recipe.refresh_from_db()
+        for name in self.recipe.image_renditions.values():
+            default_storage.delete(name)
         self.recipe.image.delete()
 
     def test_upload_image_to_recipe(self):
@@ -242,6 +946,103 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_same_image_again(self):
+        """Test uploading the same image again keeps one reference"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            for _ in range(3):
+                ntf.seek(0)
+                res = self.client.post(
+                    url,
+                    {'image': ntf},
+                    format='multipart'
+                )
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.recipe.refresh_from_db()
+        blob = models.ImageBlob.objects.get(name=self.recipe.image.name)
+        self.assertEqual(blob.refs, 1)
+
+    def test_upload_image_renditions(self):
+        """Test uploading an image exposes its renditions once ready"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', (1600, 1200))
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(res.data['renditions']),
+            {'thumbnail', 'medium', 'webp'}
+        )
+        self.recipe.refresh_from_db()
+        thumbnail = self.recipe.image_renditions['thumbnail']
+        with Image.open(default_storage.path(thumbnail)) as image:
+            self.assertEqual(image.size, (200, 150))
+        with Image.open(
+            default_storage.path(self.recipe.image_renditions['webp'])
+        ) as image:
+            self.assertEqual(image.format, 'WEBP')
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertTrue(res.data['renditions']['thumbnail'].endswith(
+            thumbnail.split('/')[-1]
+        ))
+
+    def test_upload_identical_image_shared(self):
+        """Test identical uploads share the stored image and renditions"""
+        recipe2 = sample_recipe(user=self.user)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (300, 300)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': ntf},
+                format='multipart'
+            )
+            ntf.seek(0)
+            with patch(
+                'recipe.renditions.render_renditions',
+                wraps=imaging.render_renditions
+            ) as mock_render:
+                res = self.client.post(
+                    image_upload_url(recipe2.id),
+                    {'image': ntf},
+                    format='multipart'
+                )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe2.image.name, self.recipe.image.name)
+        self.assertEqual(
+            recipe2.image_renditions,
+            self.recipe.image_renditions
+        )
+        mock_render.assert_not_called()
+
+        recipe2.delete()
+
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    @override_settings(RECIPE_RENDITIONS_ASYNC=True)
+    @patch('recipe.renditions._get_executor')
+    def test_upload_image_renditions_queued(self, mock_executor):
+        """Test renditions are queued rather than rendered in the request"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['renditions'], {})
+        mock_executor.return_value.submit.assert_called_once()
+
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = image_upload_url(self.recipe.id)
@@ -249,6 +1050,82 @@ class RecipeImageUploadTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1024)
+    def test_upload_image_over_byte_limit(self):
+        """Test uploads over the byte limit are refused while streaming"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as ntf:
+            Image.frombytes('L', (100, 100), os.urandom(10000)).save(
+                ntf, format='PNG'
+            )
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_image_decompression_bomb(self):
+        """Test images declaring too many pixels are refused unread"""
+        url = image_upload_url(self.recipe.id)
+        for width, height in ((10000, 6000), (30000, 30000)):
+            with tempfile.NamedTemporaryFile(suffix='.png') as ntf:
+                ntf.write(png_header(width, height))
+                ntf.seek(0)
+                res = self.client.post(
+                    url,
+                    {'image': ntf},
+                    format='multipart'
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('image', res.data)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_DIMENSION=500)
+    def test_upload_image_downscaled(self):
+        """Test originals larger than the dimension limit are downscaled"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (1600, 1200)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        with Image.open(self.recipe.image.path) as image:
+            self.assertEqual(image.size, (500, 375))
+            self.assertEqual(image.format, 'JPEG')
+
+    @override_settings(
+        RECIPE_IMAGE_MAX_DIMENSION=500,
+        RECIPE_IMAGE_MEMORY_LIMIT=8 * 1024 * 1024
+    )
+    def test_upload_image_memory_limit(self):
+        """Test images too large to downscale within the limit are refused
+
+        JPEGs are decoded at a reduced scale, so the same size is fine.
+        """
+        url = image_upload_url(self.recipe.id)
+        for fmt, suffix, expected in (
+            ('PNG', '.png', status.HTTP_400_BAD_REQUEST),
+            ('JPEG', '.jpg', status.HTTP_200_OK),
+        ):
+            with tempfile.NamedTemporaryFile(suffix=suffix) as ntf:
+                Image.new('RGB', (2000, 2000)).save(ntf, format=fmt)
+                ntf.seek(0)
+                res = self.client.post(
+                    url,
+                    {'image': ntf},
+                    format='multipart'
+                )
+
+            self.assertEqual(res.status_code, expected)
+
     def test_filter_recipes_by_tags(self):
         """Test returning recipes with specific tags"""
         recipe1 = sample_recipe(user=self.user, title='Thai Vegetable Curry')
@@ -267,9 +1144,9 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = serializers.RecipeSerializer(recipe1)
         serializer2 = serializers.RecipeSerializer(recipe2)
         serializer3 = serializers.RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -289,6 +1166,6 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = serializers.RecipeSerializer(recipe1)
         serializer2 = serializers.RecipeSerializer(recipe2)
         serializer3 = serializers.RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
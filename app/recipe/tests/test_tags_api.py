@@ -1,4 +1,7 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.shortcuts import reverse
 from django.test import TestCase
 
@@ -30,6 +33,7 @@ class PrivateTagsApiTests(TestCase):
     """Test the authorized user tags API"""
 
     def setUp(self):
+        cache.clear()
         self.user = get_user_model().objects.create_user(
             email='test@user.com',
             password='testpassword',
@@ -55,7 +59,49 @@ class PrivateTagsApiTests(TestCase):
         serializer = serializers.TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_tags_paginated_by_cursor(self):
+        """Test tags are paginated by name with opaque cursors"""
+        for name in ('Breakfast', 'Dinner', 'Lunch'):
+            models.Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [t['name'] for t in res.data['results']],
+            ['Lunch', 'Dinner']
+        )
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [t['name'] for t in res.data['results']],
+            ['Breakfast']
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_fast_list_parity(self):
+        """Test the fast list path renders the same bytes as serializers"""
+        tag = models.Tag.objects.create(user=self.user, name='Vegan')
+        models.Tag.objects.create(user=self.user, name='Dessert')
+        recipe = models.Recipe.objects.create(
+            title='Vegan brownie',
+            time_minutes=15,
+            price=5.00,
+            user=self.user
+        )
+        recipe.tags.add(tag)
+
+        for params in ({}, {'with_counts': 1}, {'assigned_only': 1}):
+            cache.clear()
+            fast = self.client.get(TAGS_URL, params)
+            cache.clear()
+            with self.settings(RECIPE_API_FAST_LIST=False):
+                slow = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(fast.content, slow.content)
 
     def test_tags_limited_to_user(self):
         """Test that tags are returned only for given user"""
@@ -76,8 +122,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -101,6 +147,34 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_tag_duplicate_name(self):
+        """Test creating a tag with a name the user already has fails"""
+        models.Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            models.Tag.objects.filter(user=self.user).count(), 1
+        )
+
+    @patch.object(
+        serializers.RecipeAttrSerializer,
+        'validate_name',
+        lambda self, value: value
+    )
+    def test_create_tag_name_taken_concurrently(self):
+        """Test a name created after validation is rejected cleanly"""
+        models.Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data['name'],
+            ['Tag with this name already exists']
+        )
+
     def test_retrieve_tags_assigned_to_recipes(self):
         """Test filtering tags by those assigned to recipes"""
         tag1 = models.Tag.objects.create(user=self.user, name='Breakfast')
@@ -117,8 +191,8 @@ class PrivateTagsApiTests(TestCase):
 
         serializer1 = serializers.TagSerializer(tag1)
         serializer2 = serializers.TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique value"""
@@ -142,4 +216,26 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_tags_with_counts(self):
+        """Test tags are returned with their recipe usage counts"""
+        used = models.Tag.objects.create(user=self.user, name='Breakfast')
+        models.Tag.objects.create(user=self.user, name='Lunch')
+        for title in ('Coriander eggs on toast', 'Avocado on toast'):
+            recipe = models.Recipe.objects.create(
+                title=title,
+                time_minutes=15,
+                price=55.00,
+                user=self.user
+            )
+            recipe.tags.add(used)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        counts = {
+            item['name']: item['recipe_count']
+            for item in res.data['results']
+        }
+        self.assertEqual(counts, {'Breakfast': 2, 'Lunch': 0})
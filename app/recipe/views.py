@@ -1,75 +1,292 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from core import models
 
-from recipe import serializers
+from user.authentication import CachedTokenAuthentication, \
+                                SignedTokenAuthentication
+
+from recipe import bulk, export, filters, ingest, readers, renditions, \
+                   search, serializers
+from recipe.cache import CachedListMixin, ConditionalGetMixin
+from recipe.pagination import RecipeAttrPagination, RecipePagination
+from recipe.renderers import CSVRenderer, NDJSONRenderer
+
+
+RELATIONS = {
+    'tags': models.Tag,
+    'ingredients': models.Ingredient,
+}
+# Read fields serialized from a model field of another name
+COLUMNS = {
+    'renditions': 'image_renditions',
+}
+
+
+def fast_list_enabled():
+    """Return whether lists may be built from values() rows"""
+    return getattr(settings, 'RECIPE_API_FAST_LIST', True)
+
+
+def bulk_max_items():
+    """Return how many recipes a bulk create accepts"""
+    return getattr(settings, 'RECIPE_API_BULK_MAX_ITEMS', 5000)
+
+
+class FastListMixin:
+    """List from ``values()`` rows instead of model serializers"""
 
+    def list(self, request, *args, **kwargs):
+        if not fast_list_enabled() or not self.use_fast_list():
+            return super().list(request, *args, **kwargs)
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(self.fast_rows(queryset))
+        if page is None:
+            return Response(self.fast_represent(self.fast_rows(queryset)))
+
+        return self.get_paginated_response(self.fast_represent(page))
+
+    def fast_represent(self, rows):
+        """Return the representation of a page of rows"""
+        linked = {
+            name: list(query)
+            for name, query in self.fast_linked_queries(rows).items()
+        }
+
+        return self.fast_build(rows, linked)
+
+
+class BaseRecipeAttrViewSet(ConditionalGetMixin,
+                            CachedListMixin,
+                            FastListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrPagination
+
+    def _flag(self, name):
+        """Return whether a 0/1 query parameter is set"""
+        return bool(int(self.request.query_params.get(name, 0)))
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
         queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        if self._flag('assigned_only'):
+            queryset = filters.filter_assigned(queryset, self.recipe_field)
+        if self._flag('with_counts'):
+            queryset = filters.annotate_recipe_count(
+                queryset,
+                self.recipe_field
+            )
+
+        return queryset.filter(user=self.request.user).order_by('-name')
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+    def use_fast_list(self):
+        """Return whether the list can be built from values() rows"""
+        return True
+
+    def fast_rows(self, queryset):
+        """Return the values() rows of the list"""
+        return readers.attr_rows(queryset, self._flag('with_counts'))
+
+    def fast_linked_queries(self, rows):
+        """Return the queries of the objects linked to a page of rows"""
+        return {}
+
+    def fast_build(self, rows, linked):
+        """Return the representation of rows and their linked objects"""
+        return rows
+
+    def get_serializer_class(self):
+        """Return the counting serializer when counts are requested"""
+        if self.action == 'list' and self._flag('with_counts'):
+            return self.count_serializer_class
+        elif self.action == 'batch':
+            return serializers.RecipeAttrBatchSerializer
+
+        return self.serializer_class
 
     def perform_create(self, serializer):
         """Create a new tag"""
         serializer.save(user=self.request.user)
 
+    @action(methods=['POST'], detail=False, url_path='batch')
+    def batch(self, request):
+        """Return the objects with the given names, creating missing ones"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        objects = bulk.get_or_create_by_names(
+            self.queryset.model,
+            request.user,
+            serializer.validated_data['names']
+        )
+
+        return Response(objects, status=status.HTTP_200_OK)
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database"""
     queryset = models.Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
+    recipe_field = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage Ingredients in the database"""
     queryset = models.Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
+    recipe_field = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin,
+                    CachedListMixin,
+                    FastListMixin,
+                    viewsets.ModelViewSet):
     """Manage Recipies in the database"""
     queryset = models.Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipePagination
+
+    def _filter_related(self, queryset, field):
+        """Apply the ?<field>= and ?<field>_mode= filters if given"""
+        params = self.request.query_params
+        if not params.get(field):
+            return queryset
+
+        ids = filters.params_to_ints(field, params[field])
+        mode_param = f'{field}_mode'
+        mode = filters.param_to_mode(mode_param, params.get(mode_param))
 
-    def _params_to_ints(self, qs):
-        """Convert a list of string IDs into a lost of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+        return filters.filter_recipes_by_related(queryset, field, ids, mode)
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        queryset = self.queryset.defer('search_vector')
+        queryset = self._filter_related(queryset, 'tags')
+        queryset = self._filter_related(queryset, 'ingredients')
+        text = self.request.query_params.get('search', '').strip()
+        if text:
+            queryset = search.search_recipes(queryset, text)
+
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+
+        return self._with_related(queryset)
+
+    def _requested_names(self, param, allowed):
+        """Return the names listed in a read query parameter, if given"""
+        value = self.request.query_params.get(param)
+        if value is None or self.action not in ('list', 'retrieve'):
+            return None
+
+        return filters.params_to_names(param, value, allowed)
+
+    def _requested_fields(self):
+        """Return the fields to serialize, or None for all of them"""
+        if self.action == 'retrieve':
+            allowed = serializers.RecipeDetailSerializer.read_fields
+        else:
+            allowed = serializers.RecipeSerializer.read_fields
+
+        return self._requested_names('fields', allowed)
+
+    def _requested_expand(self):
+        """Return the relations to embed as nested objects"""
+        return self._requested_names(
+            'expand',
+            serializers.RecipeSerializer.expandable_fields
+        ) or []
+
+    def _with_related(self, queryset):
+        """Load only the columns and relations each read action needs"""
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+
+        fields = self._requested_fields()
+        if fields is None:
+            fields = serializers.RecipeSerializer.read_fields
+        else:
+            columns = [
+                COLUMNS.get(name, name)
+                for name in fields if name not in RELATIONS
+            ]
+            queryset = queryset.only('id', *columns)
 
-        return queryset.filter(user=self.request.user)
+        expand = self._requested_expand()
+        for relation, model in RELATIONS.items():
+            if relation not in fields:
+                continue
+            if self.action == 'retrieve' or relation in expand:
+                columns = ('id', 'name')
+            else:
+                columns = ('id',)
+            queryset = queryset.prefetch_related(Prefetch(
+                relation,
+                queryset=model.objects.only(*columns).order_by('id')
+            ))
+
+        return queryset
+
+    def use_fast_list(self):
+        """Return whether the list can be built from values() rows"""
+        return not self._requested_expand()
+
+    def fast_rows(self, queryset):
+        """Return the values() rows of the list"""
+        return readers.recipe_rows(queryset, self._fast_fields())
+
+    def fast_linked_queries(self, rows):
+        """Return the queries of the objects linked to a page of rows"""
+        return readers.linked_ids_queries(
+            [row['id'] for row in rows],
+            self._fast_fields()
+        )
+
+    def fast_build(self, rows, linked):
+        """Return the representation of rows and their linked objects"""
+        return readers.build_recipes(rows, self._fast_fields(), linked)
+
+    def _fast_fields(self):
+        """Return the serialized fields in serializer order"""
+        fields = self._requested_fields()
+        return [
+            name for name in serializers.RecipeSerializer.read_fields
+            if fields is None or name in fields
+        ]
+
+    def get_serializer_context(self):
+        """Pass the requested fieldset to the serializer"""
+        context = super().get_serializer_context()
+        context['fields'] = self._requested_fields()
+        context['expand'] = self._requested_expand()
+        return context
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            super().retrieve,
+            *args,
+            **kwargs
+        )
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -77,6 +294,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk_create':
+            return serializers.RecipeBulkItemSerializer
 
         return self.serializer_class
 
@@ -84,23 +303,108 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new user"""
         serializer.save(user=self.request.user)
 
+    def initialize_request(self, request, *args, **kwargs):
+        """Stream image uploads to disk under the upload byte limit"""
+        drf_request = super().initialize_request(request, *args, **kwargs)
+        if self.action == 'upload_image':
+            request.upload_handlers = [ingest.LimitedUploadHandler(request)]
+
+        return drf_request
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
         recipe = self.get_object()
-        serializer = self.get_serializer(
-            recipe,
-            data=request.data
+        with ingest.ingested(request.data) as data:
+            serializer = self.get_serializer(
+                recipe,
+                data=data
+            )
+
+            if serializer.is_valid():
+                serializer.save(image_renditions={})
+                if recipe.image:
+                    renditions.enqueue(recipe)
+                return Response(
+                    serializer.data,
+                    status=status.HTTP_200_OK
+                )
+
+        return Response(
+            serializer.errors,
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-        if serializer.is_valid():
-            serializer.save()
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        """Create many recipes at once
+
+        Invalid items are reported by index and the valid ones are
+        created, unless ?atomic=1 is given, in which case nothing is
+        created if any item is invalid.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'detail': 'Expected a list of recipes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_items = bulk_max_items()
+        if len(items) > max_items:
+            return Response(
+                {'detail': f'No more than {max_items} recipes allowed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        item_serializers = [self.get_serializer(data=item) for item in items]
+        validated, errors = bulk.validate_recipes(
+            request.user,
+            item_serializers
+        )
+        error_list = [
+            {'index': index, 'errors': item_errors}
+            for index, item_errors in sorted(errors.items())
+        ]
+        atomic = bool(int(request.query_params.get('atomic', 0)))
+        valid = [item for item in validated if item is not None]
+        if not valid or (atomic and errors):
             return Response(
-                serializer.data,
-                status=status.HTTP_200_OK
+                {'created': [], 'errors': error_list},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
+        recipes = iter(bulk.create_recipes(request.user, valid))
+        created = [
+            {'index': index, 'id': next(recipes).id}
+            for index, item in enumerate(validated) if item is not None
+        ]
+
         return Response(
-            serializer.errors,
-            status=status.HTTP_400_BAD_REQUEST
+            {'created': created, 'errors': error_list},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        url_name='export',
+        renderer_classes=(NDJSONRenderer, CSVRenderer)
+    )
+    def export_library(self, request):
+        """Stream the user's whole recipe library as NDJSON or CSV"""
+        rows = export.export_rows(request.user)
+        renderer = request.accepted_renderer
+        if renderer.format == 'csv':
+            lines = export.csv_lines(rows)
+        else:
+            lines = export.ndjson_lines(rows)
+
+        response = StreamingHttpResponse(
+            lines,
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
         )
+        return response
@@ -0,0 +1,310 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, \
+                                        TokenAuthentication, \
+                                        get_authorization_header
+
+from core import aiodb
+from core.cache import advance_version, current_version
+
+from user import tokens
+
+
+TOKEN_CACHE_TIMEOUT = getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60)
+LOCAL_CACHE_SIZE = getattr(settings, 'AUTH_TOKEN_LOCAL_CACHE_SIZE', 1024)
+OWNER_CACHE_TIMEOUT = getattr(
+    settings,
+    'AUTH_TOKEN_OWNER_CACHE_TIMEOUT',
+    24 * 60 * 60
+)
+
+
+def _token_key(key):
+    """Return the shared cache key of a token, without the token in it"""
+    return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def _generation_key(user_id):
+    """Return the cache key holding a user's credentials generation"""
+    return f'auth:generation:{user_id}'
+
+
+def _deleted_key(user_id):
+    """Return the cache key marking a user as deleted"""
+    return f'auth:deleted:{user_id}'
+
+
+def credentials_generation(user_id):
+    """Return the current generation of a user's credentials"""
+    return current_version(_generation_key(user_id))
+
+
+def invalidate_credentials(user_id):
+    """Drop every cached token resolution of a user
+
+    The generation lives in the default cache, so this reaches every
+    process sharing it once the change commits; the core.W001 check
+    reports a per-process cache.
+    """
+    advance_version(_generation_key(user_id))
+
+
+def mark_deleted(user_id):
+    """Reject a deleted user's access tokens until they would expire
+
+    The mark is set once the deletion commits.
+    """
+    transaction.on_commit(lambda: cache.set(
+        _deleted_key(user_id),
+        True,
+        tokens.access_token_lifetime()
+    ))
+
+
+class LocalCache:
+    """Thread safe in-process LRU cache with a per entry expiry"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+
+            return entry[1]
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache(LOCAL_CACHE_SIZE)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication caching the token to user resolution
+
+    Resolutions, the user ID and token creation time under a hash of
+    the key, are kept in an in-process LRU cache in front of the
+    default cache for AUTH_TOKEN_CACHE_TIMEOUT seconds. Each one records
+    the generation of the user's credentials, which is bumped when the
+    user is saved or their token deleted. Generations are always read
+    from the default cache, so a stale resolution is never used by any
+    process sharing it.
+    """
+
+    def authenticate_credentials(self, key):
+        resolution = self.cached_credentials(key)
+        if resolution is not None:
+            return resolution
+
+        generation = self.resolution_generation(key)
+        user, token = super().authenticate_credentials(key)
+        self.remember_credentials(key, user, token, generation)
+
+        return user, token
+
+    async def authenticate_async(self, request):
+        """Authenticate like authenticate() without blocking the loop
+
+        Only a token missing from the caches is read from the database,
+        through an asynchronous connection. The shared cache is called
+        from worker threads, as its client blocks.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. No credentials provided.')
+            )
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_(
+                'Invalid token header. Token string should not contain '
+                'spaces.'
+            ))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_(
+                'Invalid token header. Token string should not contain '
+                'invalid characters.'
+            ))
+
+        resolution = await sync_to_async(
+            self.cached_credentials,
+            thread_sensitive=False
+        )(key)
+        if resolution is not None:
+            return resolution
+
+        generation = await sync_to_async(
+            self.resolution_generation,
+            thread_sensitive=False
+        )(key)
+        user, token = await self.fetch_credentials(key)
+        await sync_to_async(
+            self.remember_credentials,
+            thread_sensitive=False
+        )(key, user, token, generation)
+
+        return user, token
+
+    async def fetch_credentials(self, key):
+        """Read a token and its user with one asynchronous query"""
+        model = self.get_model()
+        user_model = get_user_model()
+        token_fields = [
+            field.attname for field in model._meta.concrete_fields
+        ]
+        user_fields = [
+            field.attname for field in user_model._meta.concrete_fields
+        ]
+        queryset = model.objects.filter(key=key).values(
+            *token_fields,
+            *(f'user__{name}' for name in user_fields)
+        )
+        rows = await aiodb.fetch_values(queryset)
+        if not rows:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        row = rows[0]
+        user = user_model.from_db(
+            queryset.db,
+            user_fields,
+            [row[f'user__{name}'] for name in user_fields]
+        )
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        token = model.from_db(
+            queryset.db,
+            token_fields,
+            [row[name] for name in token_fields]
+        )
+        token.user = user
+
+        return user, token
+
+    def cached_credentials(self, key):
+        """Return the cached user and token of a key, if still current"""
+        cache_key = _token_key(key)
+        entry = local_cache.get(cache_key)
+        if entry is None:
+            entry = cache.get(cache_key)
+            if entry is not None:
+                local_cache.set(cache_key, entry, TOKEN_CACHE_TIMEOUT)
+        if entry is not None:
+            user_id, generation, created = entry
+            if generation == credentials_generation(user_id):
+                return self.cached_resolution(key, user_id, created)
+
+        return None
+
+    def cached_resolution(self, key, user_id, created):
+        """Rebuild a cached resolution without reading the database
+
+        The user is loaded lazily like SignedTokenAuthentication's, so no
+        user field nor the token itself is ever stored in the cache.
+        """
+        user = get_user_model().from_db(None, ['id'], [user_id])
+        token = self.get_model()(key=key, user=user, created=created)
+        token._state.adding = False
+
+        return user, token
+
+    def resolution_generation(self, key):
+        """Return the owner's generation to resolve a key under
+
+        The generation is read before the database so a change made in
+        between leaves the resolution stale. Tokens never change owner,
+        but the owner is only known after the first resolution, so this
+        is None until then.
+        """
+        user_id = cache.get(f'{_token_key(key)}:user')
+        return credentials_generation(user_id) if user_id else None
+
+    def remember_credentials(self, key, user, token, generation):
+        """Cache a resolution made under resolution_generation()"""
+        cache_key = _token_key(key)
+        if generation is None:
+            cache.set(f'{cache_key}:user', user.pk, OWNER_CACHE_TIMEOUT)
+            return
+
+        entry = (user.pk, generation, token.created)
+        cache.set(cache_key, entry, TOKEN_CACHE_TIMEOUT)
+        local_cache.set(cache_key, entry, TOKEN_CACHE_TIMEOUT)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticate signed access tokens sent as "Bearer <token>"
+
+    Tokens are verified from their signature and age alone. The user is
+    loaded lazily, so requests that only need the user's ID never read
+    the database. Deactivation takes effect when the token expires.
+    Deletion takes effect at once through a mark in the default cache;
+    should the mark be evicted, loading the user fails instead.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                'Invalid bearer header. Expected a single token.'
+            )
+
+        try:
+            user_id = tokens.read_access_token(auth[1].decode())
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed(
+                'Invalid or expired access token.'
+            )
+        if cache.get(_deleted_key(user_id)):
+            raise exceptions.AuthenticationFailed('User deleted.')
+
+        # Every other field is deferred and loaded on first access
+        user = get_user_model().from_db(None, ['id'], [user_id])
+
+        return user, auth[1].decode()
+
+    async def authenticate_async(self, request):
+        """Authenticate in a worker thread, which needs only the cache"""
+        return await sync_to_async(
+            self.authenticate,
+            thread_sensitive=False
+        )(request)
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -3,6 +3,8 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from user import tokens
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the users object"""
@@ -51,3 +53,18 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for the refresh token of signed access tokens"""
+    refresh = serializers.CharField(trim_whitespace=False)
+
+    def validate(self, attrs):
+        """Validate the refresh token and return its record"""
+        record = tokens.read_refresh_token(attrs.get('refresh'))
+        if record is None:
+            msg = _('Invalid or expired refresh token')
+            raise serializers.ValidationError(msg, code='authentication')
+
+        attrs['record'] = record
+        return attrs
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_credentials, mark_deleted
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    """Drop cached token resolutions of a changed or deleted user
+
+    Covers deactivation and password changes along with every other
+    change to the user.
+    """
+    invalidate_credentials(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    """Reject the signed access tokens of a deleted user"""
+    mark_deleted(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Drop cached token resolutions of a user whose token was deleted"""
+    invalidate_credentials(instance.user_id)
@@ -0,0 +1,175 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.tests.utils import capture_on_commit_callbacks
+
+from user.authentication import CachedTokenAuthentication, LocalCache, \
+                                local_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached token resolutions"""
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@user.com',
+            password='testpassword',
+            name='Test User'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_me(self):
+        """Retrieve the profile, returning the response and query count"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ME_URL)
+
+        return res, len(queries)
+
+    def authenticate(self):
+        """Authenticate the token, returning the user and query count"""
+        request = APIRequestFactory().get(
+            ME_URL,
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            user, _ = CachedTokenAuthentication().authenticate(request)
+
+        return user, len(queries)
+
+    def warm_cache(self):
+        """Authenticate until the token resolution is cached"""
+        for _ in range(2):
+            self.get_me()
+
+    def test_cached_token_skips_database(self):
+        """Test a cached token is resolved without a query"""
+        self.warm_cache()
+
+        user, queries = self.authenticate()
+
+        self.assertEqual(queries, 0)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(self.get_me()[0].data['email'], self.user.email)
+
+    def test_cache_holds_no_secrets(self):
+        """Test neither the token key nor the user row is cached"""
+        self.warm_cache()
+
+        cached = repr(local_cache.entries) + repr(cache._cache)
+
+        self.assertNotIn(self.token.key, cached)
+        self.assertNotIn(self.user.password, cached)
+        self.assertNotIn(self.user.email, cached)
+
+    def test_shared_cache_used_by_other_processes(self):
+        """Test a cold in-process cache falls back to the shared cache"""
+        self.warm_cache()
+        local_cache.clear()
+
+        _, queries = self.authenticate()
+
+        self.assertEqual(queries, 0)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user invalidates the cached token"""
+        self.warm_cache()
+        self.user.is_active = False
+        with capture_on_commit_callbacks(execute=True):
+            self.user.save()
+
+        res, _ = self.get_me()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token invalidates its cached resolution"""
+        self.warm_cache()
+        with capture_on_commit_callbacks(execute=True):
+            self.token.delete()
+
+        res, _ = self.get_me()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates(self):
+        """Test changing the password resolves the token again"""
+        self.warm_cache()
+        with capture_on_commit_callbacks(execute=True):
+            self.client.patch(ME_URL, {'password': 'newpassword'})
+
+        _, queries = self.authenticate()
+
+        self.assertGreater(queries, 0)
+
+    def test_invalidated_on_commit(self):
+        """Test a change invalidates resolutions once it commits"""
+        self.warm_cache()
+        self.user.is_active = False
+
+        with capture_on_commit_callbacks() as callbacks:
+            self.user.save()
+            res, _ = self.get_me()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        for callback in callbacks:
+            callback()
+        res, _ = self.get_me()
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_owner_expires(self):
+        """Test the owner of a token is only cached for a while"""
+        with patch('user.authentication.OWNER_CACHE_TIMEOUT', 0):
+            self.warm_cache()
+
+            _, queries = self.authenticate()
+
+        self.assertGreater(queries, 0)
+
+    def test_invalid_token_rejected(self):
+        """Test unknown tokens are still rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res, _ = self.get_me()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LocalCacheTests(TestCase):
+    """Test the in-process LRU cache"""
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry is evicted when full"""
+        lru = LocalCache(2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+
+        lru.set('c', 3, 60)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_expired_entry_dropped(self):
+        """Test entries are not returned after their timeout"""
+        lru = LocalCache(2)
+        lru.set('a', 1, -1)
+
+        self.assertIsNone(lru.get('a'))
@@ -0,0 +1,179 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core import models
+from core.tests.utils import capture_on_commit_callbacks
+
+from user.authentication import SignedTokenAuthentication
+
+
+ACCESS_URL = reverse('user:token-access')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class SignedTokenApiTests(TestCase):
+    """Test signed access tokens and their refresh tokens"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@user.com',
+            password='testpassword',
+            name='Test User'
+        )
+        self.client = APIClient()
+
+    def obtain_tokens(self):
+        """Log in and return the access and refresh tokens"""
+        res = self.client.post(ACCESS_URL, {
+            'email': 'test@user.com',
+            'password': 'testpassword',
+        })
+
+        return res.data['access'], res.data['refresh']
+
+    def test_create_access_token(self):
+        """Test logging in returns access and refresh tokens"""
+        res = self.client.post(ACCESS_URL, {
+            'email': 'test@user.com',
+            'password': 'testpassword',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(res.data),
+            {'access', 'refresh', 'expires_in'}
+        )
+        self.assertEqual(models.RefreshToken.objects.count(), 1)
+
+    def test_create_access_token_invalid_credentials(self):
+        """Test no tokens are issued for invalid credentials"""
+        res = self.client.post(ACCESS_URL, {
+            'email': 'test@user.com',
+            'password': 'wrong',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.RefreshToken.objects.exists())
+
+    def test_access_token_authenticates(self):
+        """Test the access token authenticates API requests"""
+        access, _ = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_access_token_verified_without_database(self):
+        """Test verifying an access token does not query the database"""
+        access, _ = self.obtain_tokens()
+        request = APIRequestFactory().get(
+            RECIPES_URL,
+            HTTP_AUTHORIZATION=f'Bearer {access}'
+        )
+
+        with self.assertNumQueries(0):
+            user, _ = SignedTokenAuthentication().authenticate(request)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertTrue(user.is_authenticated)
+
+    def test_tampered_access_token_rejected(self):
+        """Test access tokens with a bad signature are rejected"""
+        access, _ = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}x')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(ACCESS_TOKEN_LIFETIME=-1)
+    def test_expired_access_token_rejected(self):
+        """Test access tokens are rejected after their lifetime"""
+        access, _ = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_access_token_rejected(self):
+        """Test access tokens of a deleted user are rejected"""
+        access, _ = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with capture_on_commit_callbacks(execute=True):
+            self.user.delete()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Soup',
+            'time_minutes': 10,
+            'price': '5.00',
+        })
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_rejected_without_cache_mark(self):
+        """Test loading a deleted user's profile fails authentication"""
+        access, _ = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.user.delete()
+        cache.clear()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_access_token(self):
+        """Test a refresh token issues a new working access token"""
+        _, refresh = self.obtain_tokens()
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {res.data["access"]}'
+        )
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+    def test_revoked_refresh_token_rejected(self):
+        """Test a revoked refresh token issues no access tokens"""
+        _, refresh = self.obtain_tokens()
+
+        res = self.client.post(REVOKE_URL, {'refresh': refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_token_invalid_after_password_change(self):
+        """Test changing the password invalidates refresh tokens"""
+        _, refresh = self.obtain_tokens()
+        self.user.set_password('newpassword')
+        self.user.save()
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_token_invalid_for_inactive_user(self):
+        """Test deactivated users cannot refresh access tokens"""
+        _, refresh = self.obtain_tokens()
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
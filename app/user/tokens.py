@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from core import models
+
+
+ACCESS_SALT = 'user.tokens.access'
+REFRESH_SALT = 'user.tokens.refresh'
+
+
+def access_token_lifetime():
+    """Return how many seconds an access token is valid for"""
+    return getattr(settings, 'ACCESS_TOKEN_LIFETIME', 5 * 60)
+
+
+def refresh_token_lifetime():
+    """Return how many seconds a refresh token is valid for"""
+    return getattr(settings, 'REFRESH_TOKEN_LIFETIME', 14 * 24 * 60 * 60)
+
+
+def issue_access_token(user):
+    """Return a signed access token for the user"""
+    return signing.dumps({'uid': user.pk}, salt=ACCESS_SALT)
+
+
+def read_access_token(token):
+    """Return the user ID of a valid access token
+
+    Only the signature and age are checked, so no database is needed.
+    Raises signing.BadSignature, or its SignatureExpired subclass.
+    """
+    payload = signing.loads(
+        token,
+        salt=ACCESS_SALT,
+        max_age=access_token_lifetime()
+    )
+
+    return payload['uid']
+
+
+def issue_refresh_token(user):
+    """Create a refresh record for the user and return its signed token
+
+    The token carries the user's session auth hash, so changing the
+    password invalidates it.
+    """
+    record = models.RefreshToken.objects.create(
+        user=user,
+        expires=timezone.now() + timedelta(seconds=refresh_token_lifetime())
+    )
+
+    return signing.dumps(
+        {'jti': str(record.jti), 'hash': user.get_session_auth_hash()},
+        salt=REFRESH_SALT
+    )
+
+
+def read_refresh_token(token):
+    """Return the refresh record of a token, or None if it is not valid
+
+    Tokens are invalid once revoked or expired, when the user is
+    inactive, or when the user's password has changed.
+    """
+    try:
+        payload = signing.loads(
+            token,
+            salt=REFRESH_SALT,
+            max_age=refresh_token_lifetime()
+        )
+    except signing.BadSignature:
+        return None
+
+    record = models.RefreshToken.objects.select_related('user').filter(
+        jti=payload['jti'],
+        revoked=False,
+        expires__gt=timezone.now()
+    ).first()
+    if record is None or not record.user.is_active:
+        return None
+    if not constant_time_compare(
+        payload['hash'],
+        record.user.get_session_auth_hash()
+    ):
+        return None
+
+    return record
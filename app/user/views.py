@@ -1,7 +1,10 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import exceptions, generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
-from user import serializers
+from user import serializers, tokens
+from user.authentication import CachedTokenAuthentication, \
+                                SignedTokenAuthentication
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -15,12 +18,75 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
+def access_token_data(user):
+    """Return a new access token for the user with its lifetime"""
+    return {
+        'access': tokens.issue_access_token(user),
+        'expires_in': tokens.access_token_lifetime(),
+    }
+
+
+class CreateAccessTokenView(generics.GenericAPIView):
+    """Create a signed access token and a refresh token for the user"""
+    serializer_class = serializers.AuthTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+
+        return Response({
+            **access_token_data(user),
+            'refresh': tokens.issue_refresh_token(user),
+        })
+
+
+class RefreshAccessTokenView(generics.GenericAPIView):
+    """Create a new access token from a refresh token"""
+    serializer_class = serializers.RefreshTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        record = serializer.validated_data['record']
+
+        return Response(access_token_data(record.user))
+
+
+class RevokeRefreshTokenView(generics.GenericAPIView):
+    """Revoke a refresh token so it creates no more access tokens"""
+    serializer_class = serializers.RefreshTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        record = serializer.validated_data['record']
+        record.revoked = True
+        record.save(update_fields=['revoked'])
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = serializers.UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication
+    )
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and return authenticated user"""
-        return self.request.user
+        user = self.request.user
+        if user.get_deferred_fields():
+            try:
+                user.refresh_from_db()
+            except user.DoesNotExist:
+                # A signed access token outliving its deleted user
+                raise exceptions.AuthenticationFailed('User deleted.')
+
+        return user